@@ -0,0 +1,78 @@
+import numpy as np
+from os import path
+from sys import argv, exit
+
+from parameters import load_parameters
+from procedural_connectivity import curand_uniform, get_va_benchmark_connectivity
+
+def load_connectivity(filename, num_pre):
+    # Read row lengths followed by concatenated postsynaptic indices written by simulator.cc
+    data = np.fromfile(filename, dtype=np.uint32)
+    row_lengths = data[:num_pre].astype(np.int64)
+    return row_lengths, data[num_pre:].astype(np.int64)
+
+def find_sequence_offset(connectivity, row_lengths, indices, max_offset, block_size=4096, prefix_length=8):
+    """
+    Search for the first Philox sequence GeNN used for this synapse group by
+    comparing the start of its last row with candidate sequences. The last
+    row is used as, without autapses, it is least likely to have a draw
+    rejected near its start.
+    """
+    row = connectivity.num_pre - 1
+    prefix = indices[-row_lengths[row]:][:prefix_length] if row_lengths[row] > 0 else indices[:0]
+    for b in range(0, max_offset, block_size):
+        # Calculate first positions of candidate sequences
+        u = curand_uniform(connectivity.seed, np.arange(b, b + block_size) + row, 0, len(prefix))
+        positions = np.cumsum(1 + (np.log(u) * connectivity.prob_log_recip).astype(np.int64), axis=1) - 1
+
+        match = np.where(np.all(positions == prefix[np.newaxis, :], axis=1))[0]
+        if len(match) > 0:
+            return b + match[0]
+    return None
+
+if __name__ == '__main__':
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    connectivity_path = args[0] if len(args) > 0 else "."
+    seed = int(options.get("seed", 1234))
+
+    # Regenerate connectivity of the model configured in parameters.h
+    # **NOTE** sparse connectivity is built with one thread per row
+    parameters = load_parameters()
+    parameters["proceduralConnectivity"] = False
+    max_offset = int(options.get("max-offset", 4 * parameters["numNeurons"]))
+    connectivity = get_va_benchmark_connectivity(parameters, seed)
+
+    all_match = True
+    for name, c in sorted(connectivity.items()):
+        row_lengths, indices = load_connectivity(path.join(connectivity_path, "connectivity_%s.bin" % name), c.num_pre)
+
+        # GeNN assigns Philox sequences to synapse groups in the order it initialises them so search for offset
+        c.sequence_offset = find_sequence_offset(c, row_lengths, indices, max_offset)
+        if c.sequence_offset is None:
+            print("%s: unable to find sequence offset" % name)
+            all_match = False
+            continue
+
+        # Compare rows in blocks
+        mismatched_rows = 0
+        row_starts = np.concatenate(([0], np.cumsum(row_lengths)))
+        for b, block_row_lengths, block_indices in c.iter_blocks():
+            genn_indices = indices[row_starts[b]:row_starts[b + len(block_row_lengths)]]
+            genn_row_lengths = row_lengths[b:b + len(block_row_lengths)]
+            if np.array_equal(block_row_lengths, genn_row_lengths) and np.array_equal(block_indices, genn_indices):
+                continue
+
+            # Count mismatched rows within block
+            block_starts = np.concatenate(([0], np.cumsum(block_row_lengths)))
+            genn_starts = np.concatenate(([0], np.cumsum(genn_row_lengths)))
+            mismatched_rows += sum(not np.array_equal(block_indices[block_starts[r]:block_starts[r + 1]],
+                                                      genn_indices[genn_starts[r]:genn_starts[r + 1]])
+                                   for r in range(len(block_row_lengths)))
+
+        all_match = all_match and (mismatched_rows == 0)
+        print("%s: sequence offset %u, %u synapses, %u/%u rows differ"
+              % (name, c.sequence_offset, len(indices), mismatched_rows, c.num_pre))
+
+    exit(0 if all_match else 1)
@@ -12,7 +12,7 @@ void modelDefinition(NNmodel &model)
     model.setDT(1.0);
     model.setName("va_benchmark");
     model.setDefaultVarLocation(VarLocation::DEVICE);
-    model.setDefaultSparseConnectivityLocation(VarLocation::DEVICE);
+    model.setDefaultSparseConnectivityLocation(Parameters::writeConnectivity ? VarLocation::HOST_DEVICE : VarLocation::DEVICE);
     model.setTiming(Parameters::timing);
 
     //---------------------------------------------------------------------------
@@ -92,6 +92,14 @@ void modelDefinition(NNmodel &model)
         inhibitoryExpCurrParams, {},
         initConnectivity<InitSparseConnectivitySnippet::FixedProbability>(fixedProb));
 
+    if(Parameters::writeConnectivity) {
+        // Set maximum row lengths so simulator knows stride of rows
+        ee->setMaxConnections(Parameters::getMaxRowLength(Parameters::numExcitatory));
+        ei->setMaxConnections(Parameters::getMaxRowLength(Parameters::numInhibitory));
+        ii->setMaxConnections(Parameters::getMaxRowLength(Parameters::numInhibitory));
+        ie->setMaxConnections(Parameters::getMaxRowLength(Parameters::numExcitatory));
+    }
+
     if(Parameters::presynapticParallelism) {
         // Set span type
         ee->setSpanType(SynapseGroup::SpanType::PRESYNAPTIC);
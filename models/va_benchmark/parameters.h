@@ -24,6 +24,9 @@ namespace Parameters
 
     const bool recordVoltages = false;
 
+    // Should sparse connectivity be written to disk for validating procedural_connectivity.py?
+    const bool writeConnectivity = false;
+
     // Assert settings are valid
     static_assert(presynapticParallelism || !proceduralConnectivity,
                 "Procedural connectivity can only be use with presynaptic parallelism");
@@ -31,6 +34,8 @@ namespace Parameters
                   "Bitmask and procedural connectivity cannot be used at once");
     static_assert(!presynapticParallelism || !bitmaskConnectivity,
                 "Bitmask connectivity can only be use with postsynaptic parallelism");
+    static_assert(!writeConnectivity || (!proceduralConnectivity && !bitmaskConnectivity),
+                  "Only sparse connectivity can be written");
 
     // Number of threads to use for each row if using presynaptic parallelism
     const unsigned int numThreadsPerSpike = 8;
@@ -55,4 +60,11 @@ namespace Parameters
     const double excitatoryWeight = 4.0E-3 * scale;
     const double inhibitoryWeight = -51.0E-3 * scale;
 
+    // Maximum row length to allocate when writing connectivity (10 standard deviations above mean)
+    inline unsigned int getMaxRowLength(unsigned int numPost)
+    {
+        const double mean = (double)numPost * probabilityConnection;
+        return (unsigned int)std::ceil(mean + (10.0 * std::sqrt(mean * (1.0 - probabilityConnection))));
+    }
+
 }
@@ -0,0 +1,34 @@
+import math
+import re
+from os import path
+
+# Python equivalents of C++ functions used in parameters.h
+# **NOTE** std::round rounds halfway cases away from zero unlike Python's round
+_functions = {"std_round": lambda x: math.floor(x + 0.5) if x >= 0.0 else math.ceil(x - 0.5),
+              "std_ceil": math.ceil, "std_floor": math.floor, "std_sqrt": math.sqrt,
+              "std_log": math.log, "std_exp": math.exp}
+
+_types = {"bool": bool, "double": float, "float": float, "int": int, "unsigned int": int}
+
+def load_parameters(filename=path.join(path.dirname(path.abspath(__file__)), "parameters.h"), overrides={}):
+    # Read parameters.h and strip comments and helper function bodies
+    with open(filename, "r") as f:
+        text = re.sub(r"//[^\n]*", "", f.read())
+    text = re.sub(r"inline[^{;]*\{[^}]*\}", "", text)
+
+    # Evaluate each constant in order so later ones can refer to earlier ones
+    parameters = {}
+    for type_name, name, expression in re.findall(r"const\s+(bool|double|float|unsigned int|int)\s+(\w+)\s*=\s*([^;]+);", text):
+        # Convert C++ expression to Python, dropping casts as result is converted to declared type
+        expression = re.sub(r"\((?:unsigned int|int|double|float)\)", "", expression)
+        expression = expression.replace("std::", "std_").replace("true", "True").replace("false", "False")
+
+        # Use overriden value instead if one is provided so constants derived from it are updated
+        if name in overrides:
+            parameters[name] = _types[type_name](overrides[name])
+            continue
+
+        namespace = dict(_functions)
+        namespace.update(parameters)
+        parameters[name] = _types[type_name](eval(expression, {"__builtins__": {}}, namespace))
+    return parameters
@@ -1,12 +1,23 @@
 import csv
 import matplotlib.pyplot as plt
 import numpy as np
+from sys import argv
 
+from parameters import load_parameters
+
+# Only excitatory spikes are recorded
+num_excitatory = load_parameters()["numExcitatory"]
+
+# Bin width for rates can be passed on command line
+bin_ms = float(argv[1]) if len(argv) > 1 else 10.0
 
 # Read CSV spikes
 spikes = np.loadtxt("spikes.csv", delimiter=",", skiprows=1,
                     dtype={"names": ("time", "neuron_id"),
-                           "formats": (np.float, np.int)})
+                           "formats": (float, int)})
+
+# Round duration up to whole number of bins
+duration_ms = np.ceil(np.amax(spikes["time"]) / bin_ms) * bin_ms
 
 # Create plot
 figure, axes = plt.subplots(2, sharex=True)
@@ -15,15 +26,15 @@ figure, axes = plt.subplots(2, sharex=True)
 axes[0].scatter(spikes["time"], spikes["neuron_id"], s=2, edgecolors="none")
 
 # Plot rates
-bins = np.arange(0, 10000 + 1, 10)
-rate = np.histogram(spikes["time"], bins=bins)[0] *  (1000.0 / 10.0) * (1.0 / 3200.0)
+bins = np.arange(0, duration_ms + bin_ms, bin_ms)
+rate = np.histogram(spikes["time"], bins=bins)[0] *  (1000.0 / bin_ms) * (1.0 / num_excitatory)
 axes[1].plot(bins[0:-1], rate)
 
 axes[0].set_title("Spikes")
 axes[1].set_title("Firing rates")
 
-axes[0].set_xlim((0, 10000))
-axes[0].set_ylim((0, 3200))
+axes[0].set_xlim((0, duration_ms))
+axes[0].set_ylim((0, num_excitatory))
 
 axes[0].set_ylabel("Neuron number")
 axes[1].set_ylabel("Mean firing rate [Hz]")
@@ -0,0 +1,224 @@
+import numpy as np
+
+# Philox4x32-10 constants (Salmon et al. 2011)
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint64(0x9E3779B9)
+PHILOX_W1 = np.uint64(0xBB67AE85)
+MASK_32 = np.uint64(0xFFFFFFFF)
+
+# curand's scale for converting 32-bit integers to uniform floats in (0, 1]
+CURAND_2POW32_INV = np.float32(2.3283064e-10)
+
+def philox4x32_10(ctr, key):
+    """
+    Vectorised Philox4x32-10 block function as used by curand.
+
+    Parameters
+    ----------
+    ctr : tuple of 4 arrays of 32-bit counter words (stored as uint64)
+    key : tuple of 2 arrays of 32-bit key words (stored as uint64)
+
+    Returns
+    -------
+    tuple of 4 arrays of 32-bit output words (stored as uint64)
+    """
+    c0, c1, c2, c3 = (np.asarray(c, dtype=np.uint64) for c in ctr)
+    k0, k1 = (np.asarray(k, dtype=np.uint64) for k in key)
+    for r in range(10):
+        # Bump key between rounds
+        if r > 0:
+            k0 = (k0 + PHILOX_W0) & MASK_32
+            k1 = (k1 + PHILOX_W1) & MASK_32
+
+        # Round function
+        product0 = PHILOX_M0 * c0
+        product1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = (((product1 >> np.uint64(32)) ^ c1 ^ k0), (product1 & MASK_32),
+                          ((product0 >> np.uint64(32)) ^ c3 ^ k1), (product0 & MASK_32))
+    return c0, c1, c2, c3
+
+def curand_uniform(seed, sequences, start, count):
+    """
+    Generate uniform floats following curand's Philox4_32_10 generator,
+    intended to match calling curand_uniform on a state initialised with
+    curand_init(seed, 0, 0) and advanced with skipahead_sequence(sequence).
+    This has not been validated against curand output. Returns a
+    (len(sequences), count) array of draws start to start + count from each
+    sequence.
+    """
+    sequences = np.asarray(sequences, dtype=np.uint64)
+
+    # Philox generates 4 numbers per counter value
+    # **NOTE** skipahead_sequence advances the upper 64 bits of the counter
+    first_block = start // 4
+    num_blocks = ((start + count + 3) // 4) - first_block
+    block = np.arange(first_block, first_block + num_blocks, dtype=np.uint64)[np.newaxis, :]
+    seq = sequences[:, np.newaxis]
+    outputs = philox4x32_10((block & MASK_32, block >> np.uint64(32), seq & MASK_32, seq >> np.uint64(32)),
+                            (np.uint64(seed) & MASK_32, np.uint64(seed) >> np.uint64(32)))
+
+    # Interleave x, y, z and w outputs and select draws
+    draws = np.stack(outputs, axis=2).reshape(len(sequences), num_blocks * 4)
+    draws = draws[:, (start - (first_block * 4)):(start - (first_block * 4)) + count]
+
+    # Convert to float in the same way as curand (the product is exact so there is only one rounding)
+    return (draws.astype(np.uint32).astype(np.float32) * CURAND_2POW32_INV) + (CURAND_2POW32_INV / np.float32(2.0))
+
+class FixedProbabilityConnectivity(object):
+    """
+    Lazily generates fixed probability connectivity following the algorithm of
+    GeNN's FixedProbability and FixedProbabilityNoAutapse sparse connectivity
+    initialisation snippets. This has not yet been validated against
+    connectivity written by GeNN (see compare_connectivity.py).
+    Each row (or, with procedural connectivity and several threads per spike,
+    each thread's slice of each row) uses its own Philox sequence and draws
+    geometrically-distributed gaps between postsynaptic indices.
+
+    Parameters
+    ----------
+    num_pre : number of presynaptic neurons
+    num_post : number of postsynaptic neurons
+    probability : probability of connection
+    seed : GeNN model seed
+    sequence_offset : first Philox sequence used by this synapse group
+    autapse : whether connections from a neuron to itself are allowed
+    num_threads_per_row : number of threads per spike (1 for sparse connectivity)
+    """
+    def __init__(self, num_pre, num_post, probability, seed, sequence_offset=0,
+                 autapse=True, num_threads_per_row=1):
+        self.num_pre = num_pre
+        self.num_post = num_post
+        self.seed = seed
+        self.sequence_offset = sequence_offset
+        self.autapse = autapse
+        self.num_threads_per_row = num_threads_per_row
+
+        # Derived parameter is calculated in double precision and used in single
+        self.prob_log_recip = np.float32(1.0 / np.log(1.0 - probability))
+
+        # Split postsynaptic neurons between threads
+        self.num_post_per_thread = (num_post + num_threads_per_row - 1) // num_threads_per_row
+        self.thread_post_begin = np.arange(num_threads_per_row) * self.num_post_per_thread
+        self.thread_num_post = np.minimum(self.num_post_per_thread, num_post - self.thread_post_begin)
+
+        # Draw enough numbers that almost all sub-rows finish in one pass
+        mean = self.num_post_per_thread * probability
+        self.draws_per_pass = int(np.ceil(mean + (6.0 * np.sqrt(mean * (1.0 - probability))))) + 8
+
+    def _build_sub_rows(self, pre, thread):
+        # Get sequence, number of postsynaptic neurons and autapse index of each sub-row
+        sequences = self.sequence_offset + (pre * self.num_threads_per_row) + thread
+        num_post = self.thread_num_post[thread]
+
+        # **NOTE** like GeNN's snippet, autapses are detected by comparing
+        # the presynaptic index with the index within the sub-row
+        id_pre = pre if not self.autapse else np.full(len(pre), -1)
+
+        prev_j = np.full(len(pre), -1, dtype=np.int64)
+        active = np.arange(len(pre))
+        sub_row_indices = [[] for _ in range(len(pre))]
+        start = 0
+        while len(active) > 0:
+            # Draw next pass of uniforms for unfinished sub-rows and convert to gaps
+            u = curand_uniform(self.seed, sequences[active], start, self.draws_per_pass)
+            gaps = 1 + (np.log(u) * self.prob_log_recip).astype(np.int64)
+
+            # Repeatedly reject first draw in each sub-row which would create an autapse
+            rejected = np.zeros(gaps.shape, dtype=bool)
+            while True:
+                positions = prev_j[active, np.newaxis] + np.cumsum(np.where(rejected, 0, gaps), axis=1)
+                autapse = ~rejected & (positions == id_pre[active, np.newaxis])
+                has_autapse = np.any(autapse, axis=1)
+                if not np.any(has_autapse):
+                    break
+                rows = np.where(has_autapse)[0]
+                rejected[rows, np.argmax(autapse[rows], axis=1)] = True
+
+            # Add accepted positions within sub-row
+            valid = ~rejected & (positions < num_post[active, np.newaxis])
+            for a, p, v in zip(active, positions, valid):
+                sub_row_indices[a].append(p[v])
+
+            # Sub-rows finish once a position falls outside them
+            finished = np.any(~rejected & (positions >= num_post[active, np.newaxis]), axis=1)
+            prev_j[active] = positions[:, -1]
+            active = active[~finished]
+            start += self.draws_per_pass
+
+        return [np.concatenate(s) if len(s) > 1 else s[0] for s in sub_row_indices]
+
+    def get_rows(self, pre):
+        """
+        Generate rows of presynaptic neurons.
+
+        Parameters
+        ----------
+        pre : array of presynaptic indices
+
+        Returns
+        -------
+        row_lengths : array of number of synapses in each row
+        indices : concatenated sorted postsynaptic indices of each row
+        """
+        pre = np.asarray(pre, dtype=np.int64)
+
+        # Build every thread's sub-row of every row
+        thread_indices = [self._build_sub_rows(pre, np.full(len(pre), t, dtype=np.int64))
+                          for t in range(self.num_threads_per_row)]
+
+        # Offset sub-rows to their thread's postsynaptic range and concatenate
+        row_lengths = np.zeros(len(pre), dtype=np.int64)
+        indices = []
+        for r in range(len(pre)):
+            for t in range(self.num_threads_per_row):
+                indices.append(thread_indices[t][r] + self.thread_post_begin[t])
+                row_lengths[r] += len(thread_indices[t][r])
+
+        return row_lengths, (np.concatenate(indices) if len(indices) > 0 else np.zeros(0, dtype=np.int64))
+
+    def get_row(self, pre):
+        return self.get_rows([pre])[1]
+
+    def iter_blocks(self, block_size=1024, begin=0, end=None):
+        """
+        Lazily generate blocks of consecutive rows, yielding the first
+        presynaptic index, row lengths and indices of each block.
+        """
+        end = self.num_pre if end is None else end
+        for b in range(begin, end, block_size):
+            row_lengths, indices = self.get_rows(np.arange(b, min(end, b + block_size)))
+            yield b, row_lengths, indices
+
+    def get_degrees(self, block_size=1024):
+        """
+        Calculate out-degree of every presynaptic neuron and in-degree of
+        every postsynaptic neuron without materialising the matrix.
+        """
+        out_degrees = np.zeros(self.num_pre, dtype=np.int64)
+        in_degrees = np.zeros(self.num_post, dtype=np.int64)
+        for b, row_lengths, indices in self.iter_blocks(block_size):
+            out_degrees[b:b + len(row_lengths)] = row_lengths
+            in_degrees += np.bincount(indices, minlength=self.num_post)
+        return out_degrees, in_degrees
+
+def get_va_benchmark_connectivity(parameters, seed=1234, sequence_offsets=None):
+    """
+    Create FixedProbabilityConnectivity objects for each synapse group of the
+    va_benchmark model as configured by parameters (see parameters.py). If
+    sequence_offsets are not specified, each group uses its own range of
+    Philox sequences so groups are independent.
+    """
+    num = {"E": parameters["numExcitatory"], "I": parameters["numInhibitory"]}
+    num_threads_per_row = (parameters["numThreadsPerSpike"]
+                           if parameters["proceduralConnectivity"] and parameters["presynapticParallelism"] else 1)
+
+    connectivity = {}
+    next_offset = 0
+    for n in ("EE", "EI", "II", "IE"):
+        offset = next_offset if sequence_offsets is None else sequence_offsets.get(n, 0)
+        connectivity[n] = FixedProbabilityConnectivity(num[n[0]], num[n[1]], parameters["probabilityConnection"], seed,
+                                                       offset, autapse=(n[0] != n[1]),
+                                                       num_threads_per_row=num_threads_per_row)
+        next_offset += num[n[0]] * num_threads_per_row
+    return connectivity
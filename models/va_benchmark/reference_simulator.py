@@ -0,0 +1,126 @@
+import numpy as np
+from sys import argv
+from time import perf_counter
+
+from parameters import load_parameters
+from procedural_connectivity import get_va_benchmark_connectivity
+
+# LIF and exponential synapse parameters from model.cc
+C = 1.0
+TAU_M = 20.0
+V_REST = -49.0
+I_OFFSET = 0.0
+TAU_REFRAC = 5.0
+TAU_SYN = {"E": 5.0, "I": 10.0}
+
+def build_csr(connectivity, block_size=1024):
+    # Generate all rows and convert to CSR
+    row_lengths = np.zeros(connectivity.num_pre, dtype=np.int64)
+    indices = []
+    for b, block_row_lengths, block_indices in connectivity.iter_blocks(block_size):
+        row_lengths[b:b + len(block_row_lengths)] = block_row_lengths
+        indices.append(block_indices.astype(np.uint32))
+
+    row_ptr = np.zeros(connectivity.num_pre + 1, dtype=np.int64)
+    np.cumsum(row_lengths, out=row_ptr[1:])
+    return row_ptr, np.concatenate(indices)
+
+def get_csr_targets(csr, spikes):
+    # Gather postsynaptic indices of all rows of spiking neurons without looping
+    row_ptr, indices = csr
+    starts = row_ptr[spikes]
+    lengths = row_ptr[spikes + 1] - starts
+    offsets = np.arange(np.sum(lengths)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets]
+
+def get_procedural_targets(connectivity, spikes):
+    # Regenerate rows of spiking neurons
+    return connectivity.get_rows(spikes)[1]
+
+if __name__ == '__main__':
+    # Parse --key=value options
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+
+    # Load parameters, allowing network size to be overriden for quick checks
+    parameters = load_parameters(overrides={"numNeurons": options["num-neurons"]} if "num-neurons" in options else {})
+    record_spikes = parameters["recordSpikes"] or "record-spikes" in options
+    record_voltages = parameters["recordVoltages"] or "record-voltages" in options
+    procedural = parameters["proceduralConnectivity"] or "procedural" in options
+    duration = float(options.get("duration", 1000.0))
+    seed = int(options.get("seed", 1234))
+
+    weight = {"E": np.float32(parameters["excitatoryWeight"]), "I": np.float32(parameters["inhibitoryWeight"])}
+
+    # Create connectivity, either building CSR or regenerating rows of spiking neurons each timestep
+    # **NOTE** connectivity is always generated with one thread per row so both modes are identical
+    parameters["proceduralConnectivity"] = False
+    connectivity = get_va_benchmark_connectivity(parameters, seed)
+    if procedural:
+        targets = {n: (lambda s, c=c: get_procedural_targets(c, s)) for n, c in connectivity.items()}
+    else:
+        csr = {n: build_csr(c) for n, c in connectivity.items()}
+        targets = {n: (lambda s, c=c: get_csr_targets(c, s)) for n, c in csr.items()}
+
+    # Derived parameters, calculated in double precision like GeNN and used in single
+    dt = parameters["timestep"]
+    exp_tc = np.float32(np.exp(-dt / TAU_M))
+    r_membrane = np.float32(TAU_M / C)
+    exp_decay = {n: np.float32(np.exp(-dt / t)) for n, t in TAU_SYN.items()}
+    syn_init = {n: np.float32((t * (1.0 - np.exp(-dt / t))) / dt) for n, t in TAU_SYN.items()}
+
+    # Initialise state of each population with voltages uniformly distributed between reset and threshold
+    rng = np.random.RandomState(seed)
+    num = {"E": parameters["numExcitatory"], "I": parameters["numInhibitory"]}
+    v = {p: rng.uniform(parameters["resetVoltage"], parameters["thresholdVoltage"], n).astype(np.float32)
+         for p, n in num.items()}
+    refrac_time = {p: np.zeros(n, dtype=np.float32) for p, n in num.items()}
+    in_syn = {p: {s: np.zeros(n, dtype=np.float32) for s in "EI"} for p, n in num.items()}
+    spikes = {p: np.zeros(0, dtype=np.int64) for p in num.keys()}
+
+    spike_file = open("spikes.csv", "w") if record_spikes else None
+    voltage_file = open("voltages.bin", "wb") if record_voltages else None
+    if spike_file is not None:
+        spike_file.write("Time [ms], Neuron ID\n")
+
+    start_time = perf_counter()
+    num_timesteps = int(round(duration / dt))
+    for i in range(num_timesteps):
+        # Propagate spikes emitted in previous timestep, as GeNN updates synapses before neurons
+        for name in connectivity.keys():
+            if len(spikes[name[0]]) > 0:
+                post_counts = np.bincount(targets[name](spikes[name[0]]), minlength=num[name[1]])
+                in_syn[name[1]][name[0]] += weight[name[0]] * post_counts.astype(np.float32)
+
+        for p in num.keys():
+            # Convert and decay synaptic input
+            i_syn = np.zeros(num[p], dtype=np.float32)
+            for s in "EI":
+                i_syn += syn_init[s] * in_syn[p][s]
+                in_syn[p][s] *= exp_decay[s]
+
+            # Integrate non-refractory neurons and count down refractory ones
+            refractory = refrac_time[p] > 0.0
+            alpha = ((i_syn + np.float32(I_OFFSET)) * r_membrane) + np.float32(V_REST)
+            v[p] = np.where(refractory, v[p], alpha - (exp_tc * (alpha - v[p])))
+            refrac_time[p] = np.where(refractory, refrac_time[p] - np.float32(dt), refrac_time[p])
+
+            # Detect spikes and reset
+            spiking = (refrac_time[p] <= 0.0) & (v[p] >= np.float32(parameters["thresholdVoltage"]))
+            v[p][spiking] = np.float32(parameters["resetVoltage"])
+            refrac_time[p][spiking] = np.float32(TAU_REFRAC)
+            spikes[p] = np.where(spiking)[0]
+
+        # Record excitatory population in the same formats as simulator.cc
+        # **NOTE** GeNN's SpikeWriterText writes times with 16 significant digits
+        t = (i + 1) * dt
+        if spike_file is not None:
+            spike_file.writelines("%.16g,%u\n" % (t, s) for s in spikes["E"])
+        if voltage_file is not None:
+            voltage_file.write(v["E"].tobytes())
+
+    print("%f, " % (perf_counter() - start_time))
+
+    if spike_file is not None:
+        spike_file.close()
+    if voltage_file is not None:
+        voltage_file.close()
@@ -1,4 +1,5 @@
 // Standard C++ includes
+#include <fstream>
 #include <iostream>
 #include <random>
 
@@ -13,12 +14,37 @@
 // Auto-generated model code
 #include "va_benchmark_CODE/definitions.h"
 
+void writeConnectivity(const std::string &filename, unsigned int numPre, unsigned int numPost,
+                       const unsigned int *rowLength, const uint32_t *ind)
+{
+    // Write row lengths followed by each row's postsynaptic indices
+    std::ofstream file(filename, std::ios::binary);
+    file.write(reinterpret_cast<const char*>(rowLength), sizeof(unsigned int) * numPre);
+
+    const unsigned int maxRowLength = Parameters::getMaxRowLength(numPost);
+    for(unsigned int i = 0; i < numPre; i++) {
+        file.write(reinterpret_cast<const char*>(&ind[i * maxRowLength]), sizeof(uint32_t) * rowLength[i]);
+    }
+}
+
 int main()
 {
     allocateMem();
     initialize();
     initializeSparse();
 
+    if(Parameters::writeConnectivity) {
+        pullEEConnectivityFromDevice();
+        pullEIConnectivityFromDevice();
+        pullIIConnectivityFromDevice();
+        pullIEConnectivityFromDevice();
+
+        writeConnectivity("connectivity_EE.bin", Parameters::numExcitatory, Parameters::numExcitatory, rowLengthEE, indEE);
+        writeConnectivity("connectivity_EI.bin", Parameters::numExcitatory, Parameters::numInhibitory, rowLengthEI, indEI);
+        writeConnectivity("connectivity_II.bin", Parameters::numInhibitory, Parameters::numInhibitory, rowLengthII, indII);
+        writeConnectivity("connectivity_IE.bin", Parameters::numInhibitory, Parameters::numExcitatory, rowLengthIE, indIE);
+    }
+
     // Open CSV output files
     SpikeRecorder<SpikeWriterTextCached> spikes(&getECurrentSpikes, &getECurrentSpikeCount, "spikes.csv", ",", true);
 
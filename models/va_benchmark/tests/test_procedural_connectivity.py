@@ -0,0 +1,87 @@
+import numpy as np
+
+from compare_connectivity import find_sequence_offset
+from procedural_connectivity import FixedProbabilityConnectivity, philox4x32_10
+
+def test_philox_known_answers():
+    # Known-answer vectors from Random123's kat_vectors
+    vectors = [((0x00000000, 0x00000000, 0x00000000, 0x00000000), (0x00000000, 0x00000000),
+                (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+               ((0xffffffff, 0xffffffff, 0xffffffff, 0xffffffff), (0xffffffff, 0xffffffff),
+                (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+               ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+                (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1))]
+    for ctr, key, expected in vectors:
+        assert tuple(int(o) for o in philox4x32_10(ctr, key)) == expected
+
+    # Vectorised evaluation matches scalar
+    outputs = philox4x32_10(tuple(np.asarray([v[0][i] for v in vectors]) for i in range(4)),
+                            tuple(np.asarray([v[1][i] for v in vectors]) for i in range(2)))
+    assert np.array_equal(np.stack(outputs, axis=1), [v[2] for v in vectors])
+
+def check_rows(connectivity, row_lengths, indices):
+    # Rows must be sorted, unique and within postsynaptic population
+    assert len(indices) == np.sum(row_lengths)
+    for r in np.split(indices, np.cumsum(row_lengths)[:-1]):
+        assert np.all(np.diff(r) > 0)
+        assert len(r) == 0 or (r[0] >= 0 and r[-1] < connectivity.num_post)
+
+def test_rows():
+    connectivity = FixedProbabilityConnectivity(1000, 800, 0.1, 1234)
+    row_lengths, indices = connectivity.get_rows(np.arange(1000))
+    check_rows(connectivity, row_lengths, indices)
+
+    # Mean degree should be within a few standard deviations of p * N
+    std = np.sqrt(800 * 0.1 * 0.9 / 1000)
+    assert abs(np.mean(row_lengths) - 80.0) < (5.0 * std)
+
+    # Individual rows and blocks must match rows generated together
+    row_starts = np.concatenate(([0], np.cumsum(row_lengths)))
+    for pre in (0, 17, 999):
+        assert np.array_equal(connectivity.get_row(pre), indices[row_starts[pre]:row_starts[pre + 1]])
+    for b, block_row_lengths, block_indices in connectivity.iter_blocks(block_size=300):
+        assert np.array_equal(block_row_lengths, row_lengths[b:b + len(block_row_lengths)])
+        assert np.array_equal(block_indices, indices[row_starts[b]:row_starts[b + len(block_row_lengths)]])
+
+    # Degrees must match rows
+    out_degrees, in_degrees = connectivity.get_degrees(block_size=300)
+    assert np.array_equal(out_degrees, row_lengths)
+    assert np.array_equal(in_degrees, np.bincount(indices, minlength=800))
+
+def test_no_autapse():
+    # With a high probability, almost every row would otherwise contain an autapse
+    connectivity = FixedProbabilityConnectivity(500, 500, 0.5, 1234, autapse=False)
+    row_lengths, indices = connectivity.get_rows(np.arange(500))
+    check_rows(connectivity, row_lengths, indices)
+    pre = np.repeat(np.arange(500), row_lengths)
+    assert not np.any(pre == indices)
+
+    # Dense rows should still have the expected mean degree
+    std = np.sqrt(500 * 0.5 * 0.5 / 500)
+    assert abs(np.mean(row_lengths) - 250.0) < (5.0 * std)
+
+def test_sub_rows():
+    # 100 postsynaptic neurons split unevenly between 3 threads of 34, 34 and 32
+    connectivity = FixedProbabilityConnectivity(200, 100, 0.2, 1234, num_threads_per_row=3)
+    row_lengths, indices = connectivity.get_rows(np.arange(200))
+    check_rows(connectivity, row_lengths, indices)
+    assert np.array_equal(connectivity.thread_post_begin, [0, 34, 68])
+    assert np.array_equal(connectivity.thread_num_post, [34, 34, 32])
+
+    # Each thread's sub-row uses its own sequence so matches a single row over the thread's range
+    row_starts = np.concatenate(([0], np.cumsum(row_lengths)))
+    for pre in (0, 99, 199):
+        row = indices[row_starts[pre]:row_starts[pre + 1]]
+        for t in range(3):
+            begin = connectivity.thread_post_begin[t]
+            end = begin + connectivity.thread_num_post[t]
+            thread = FixedProbabilityConnectivity(1, connectivity.thread_num_post[t], 0.2, 1234,
+                                                  sequence_offset=(pre * 3) + t)
+            assert np.array_equal(thread.get_row(0), row[(row >= begin) & (row < end)] - begin)
+
+def test_find_sequence_offset():
+    # Offset of a group should be recovered from its connectivity
+    connectivity = FixedProbabilityConnectivity(300, 300, 0.1, 1234, sequence_offset=1234, autapse=False)
+    row_lengths, indices = connectivity.get_rows(np.arange(300))
+    search = FixedProbabilityConnectivity(300, 300, 0.1, 1234, autapse=False)
+    assert find_sequence_offset(search, row_lengths, indices, 4096, block_size=512) == 1234
@@ -0,0 +1,293 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+from glob import glob
+from hashlib import sha1
+from os import chdir, environ, makedirs, path, stat
+from shutil import copyfile
+from six import iteritems
+from subprocess import STDOUT, call
+from sys import argv, executable, exit
+import json
+
+# Population and statistic names
+populations = ["4E", "4I", "5E", "5I", "6E", "6I", "23E", "23I"]
+statistics = ["rates", "irregularity", "corr_coeff"]
+
+# Pairs of datasets compared by plot_multi_area_kl_divergence.py
+default_pairs = [("nest", "seed_1"), ("nest", "seed_2"), ("nest", "seed_3"),
+                 ("seed_1", "seed_2"), ("seed_1", "seed_3"), ("seed_2", "seed_3")]
+
+# Local modules imported by each script (changing these also makes stages stale)
+stats_modules = ["calc_multi_area_stats.py", "prefetch.py", "profiling.py", "spike_codec.py",
+                 "spike_store.py", "shared_spikes.py"]
+plot_modules = ["plot_settings.py"]
+
+class Stage(object):
+    """
+    Stage of the figure pipeline, either running a command or calling a
+    function. Inputs and outputs are lists of paths or glob patterns
+    relative to the scripts directory and stages depend on any stage
+    whose outputs match their inputs.
+    """
+    def __init__(self, name, inputs, outputs, command=None, cwd=".", function=None):
+        self.name = name
+        self.inputs = [path.normpath(i) for i in inputs]
+        self.outputs = [path.normpath(o) for o in outputs]
+        self.command = command
+        self.cwd = cwd
+        self.function = function
+        self.dependencies = set()
+
+    def run(self, log_dir):
+        # Log output so output of parallel stages isn't interleaved
+        log_filename = path.join(log_dir, self.name.replace("/", "_") + ".log")
+        with open(log_filename, "w") as log:
+            if self.function is not None:
+                try:
+                    self.function()
+                    return 0, log_filename
+                except Exception as ex:
+                    log.write("%s\n" % ex)
+                    return 1, log_filename
+            else:
+                if not path.exists(self.cwd):
+                    makedirs(self.cwd)
+
+                # **NOTE** plotting scripts call plt.show so use non-interactive backend
+                env = dict(environ, MPLBACKEND="Agg")
+                return call(self.command, cwd=self.cwd, env=env, stdout=log, stderr=STDOUT), log_filename
+
+def expand(patterns):
+    # Expand paths and glob patterns to sorted list of existing files
+    files = set()
+    for p in patterns:
+        files.update(f for f in glob(p, recursive=True) if path.isfile(f))
+    return sorted(files)
+
+def patterns_overlap(a, b):
+    return fnmatch(a, b) or fnmatch(b, a)
+
+def hash_file(filename, hash_cache):
+    # Only rehash files whose size or modification time have changed
+    # **NOTE** spike recordings are large so rehashing them every build would be slow
+    info = stat(filename)
+    cached = hash_cache.get(filename)
+    if cached is not None and cached[0] == info.st_size and cached[1] == info.st_mtime_ns:
+        return cached[2]
+
+    digest = sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    hash_cache[filename] = [info.st_size, info.st_mtime_ns, digest.hexdigest()]
+    return digest.hexdigest()
+
+def calc_signature(stage, hash_cache):
+    # Hash stage's command together with the names and contents of its inputs
+    digest = sha1(repr((stage.command, stage.cwd, stage.inputs)).encode("utf-8"))
+    for f in expand(stage.inputs):
+        digest.update(("%s:%s;" % (f, hash_file(f, hash_cache))).encode("utf-8"))
+    return digest.hexdigest()
+
+def is_up_to_date(stage, signature, stage_state, hash_cache):
+    # Stage is up to date if inputs haven't changed since it last ran and its outputs are untouched
+    if stage_state is None or stage_state["signature"] != signature:
+        return False
+    return all(path.exists(f) and hash_file(f, hash_cache) == h for f, h in iteritems(stage_state["outputs"]))
+
+def publish_stats(source_dir, dest_dir, prefix):
+    # Copy per-neuron statistics into the prefixed files plot_multi_area.py expects
+    for s in statistics:
+        for f in glob(path.join(source_dir, "%s_*.npy" % s)):
+            copyfile(f, path.join(dest_dir, "%s_%s" % (prefix, path.basename(f))))
+
+def get_stages(config):
+    """
+    Build list of stages required to reproduce figures 1-4 from the
+    datasets described in config. Statistics are only recalculated for
+    datasets listed in config - otherwise the files in the chi_1_0 and
+    chi_1_9 directories are used as they are.
+    """
+    stages = []
+    for chi in ["chi_1_0", "chi_1_9"]:
+        chi_config = config.get(chi, {})
+        datasets = chi_config.get("datasets", {})
+
+        # Calculate statistics of each dataset in its own directory
+        for name, dataset in sorted(iteritems(datasets)):
+            data_path = dataset["data"]
+            command = [executable, path.abspath("calc_multi_area_stats.py"), path.abspath(data_path),
+                       str(chi_config["duration"])]
+            inputs = stats_modules + [path.join(data_path, "custom_Data_Model_*.json")]
+
+            # If NEST spikes are specified, add them as third argument
+            if "spikes" in dataset:
+                command.append(path.abspath(dataset["spikes"]))
+                inputs.append(dataset["spikes"] if dataset["spikes"].endswith(".hdf5")
+                              else path.join(dataset["spikes"], "*.gdf"))
+            else:
+                inputs.append(path.join(data_path, "recordings", "*"))
+
+            stages.append(Stage("stats/%s/%s" % (chi, name), inputs, [path.join(chi, name, "*.npy")],
+                                command=command + dataset.get("options", []), cwd=path.join(chi, name)))
+
+        # Publish statistics of datasets plotted in figure 3
+        for prefix, name in sorted(iteritems(chi_config.get("plot", {}))):
+            stages.append(Stage("publish/%s/%s" % (chi, prefix),
+                                [path.join(chi, name, "%s_*.npy" % s) for s in statistics],
+                                [path.join(chi, "%s_%s_*.npy" % (prefix, s)) for s in statistics],
+                                function=lambda c=chi, n=name, p=prefix: publish_stats(path.join(c, n), c, p)))
+
+        # Calculate histograms comparing pairs of datasets whose statistics are available
+        for gt, comp in chi_config.get("pairs", default_pairs):
+            if all(d in datasets or path.isdir(path.join(chi, d)) for d in (gt, comp)):
+                stages.append(Stage("histograms/%s/%s_%s" % (chi, gt, comp),
+                                    ["calc_pairwise_histograms.py", path.join(chi, gt, "*.npy"),
+                                     path.join(chi, comp, "*.npy")],
+                                    [path.join(chi, "%s_%s_*.npy" % (gt, comp))],
+                                    command=[executable, path.abspath("calc_pairwise_histograms.py"), gt, comp],
+                                    cwd=chi))
+
+    # Plot figures
+    stages.append(Stage("plot/multi_area",
+                        ["plot_multi_area.py", "spike_codec.py", "spike_store.py"] + plot_modules
+                        + [path.join(c, "%s_%s_*.npy" % (p, s)) for c in ["chi_1_0", "chi_1_9"]
+                           for p in ["genn", "nest"] for s in statistics]
+                        + [path.join(c, "genn_%s" % r, "**") for c in ["chi_1_0", "chi_1_9"]
+                           for r in ["recordings", "spike_store"]],
+                        ["../figures/multi_area.pdf"],
+                        command=[executable, "plot_multi_area.py"]))
+    stages.append(Stage("plot/microcircuit_accuracy_kl",
+                        ["plot_multi_area_kl_divergence.py"] + plot_modules
+                        + [path.join(c, "%s_%s_*.npy" % (p, s)) for c in ["chi_1_0", "chi_1_9"]
+                           for p in ["%s_%s" % pair for pair in default_pairs] for s in statistics],
+                        ["../figures/microcircuit_accuracy_kl.pdf"],
+                        command=[executable, "plot_multi_area_kl_divergence.py"]))
+    stages.append(Stage("plot/performance_scaling", ["plot_performance_scaling.py", "scaling_data.csv"] + plot_modules,
+                        ["../figures/performance_scaling.pdf"], command=[executable, "plot_performance_scaling.py"]))
+    stages.append(Stage("plot/merging_scaling", ["plot_merging_scaling.py", "merging_data.csv"] + plot_modules,
+                        ["../figures/merging_scaling.pdf"], command=[executable, "plot_merging_scaling.py"]))
+
+    # Stages depend on any other stage which produces files matching their inputs
+    for s in stages:
+        s.dependencies = set(o.name for o in stages if o is not s
+                             and any(patterns_overlap(i, p) for i in s.inputs for p in o.outputs))
+    return stages
+
+def select_stages(stages, targets):
+    # Select stages whose names start with any target, along with all the stages they depend on
+    by_name = {s.name: s for s in stages}
+    selected = set(s.name for s in stages if len(targets) == 0 or any(s.name.startswith(t) for t in targets))
+    queue = list(selected)
+    while len(queue) > 0:
+        for d in by_name[queue.pop()].dependencies:
+            if d not in selected:
+                selected.add(d)
+                queue.append(d)
+    return [s for s in stages if s.name in selected]
+
+def build(stages, state, num_jobs=1, force=False, dry_run=False, log_dir="build_logs"):
+    """
+    Run stale stages in dependency order, running up to num_jobs independent
+    stages in parallel. A stage is stale if the contents of its inputs have
+    changed since it last ran successfully or its outputs have been modified
+    or deleted. Returns True if every stage succeeded.
+    """
+    if not path.exists(log_dir):
+        makedirs(log_dir)
+
+    hash_cache = state.setdefault("hashes", {})
+    stage_states = state.setdefault("stages", {})
+    names = set(s.name for s in stages)
+    pending = list(stages)
+    status = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=num_jobs) as executor:
+        while len(pending) > 0 or len(running) > 0:
+            # Loop through stages whose dependencies have finished until no more can be scheduled
+            # **NOTE** signatures are calculated here so inputs produced by earlier stages are hashed
+            ready = [s for s in pending if all(status.get(d) is not None for d in s.dependencies & names)]
+            while len(ready) > 0:
+                for s in ready:
+                    pending.remove(s)
+                    dependency_status = [status[d] for d in s.dependencies & names]
+                    if "failed" in dependency_status:
+                        status[s.name] = "failed"
+                        print("%s: skipped as a dependency failed" % s.name)
+                        continue
+
+                    signature = calc_signature(s, hash_cache)
+                    if (not force and "stale" not in dependency_status
+                            and is_up_to_date(s, signature, stage_states.get(s.name), hash_cache)):
+                        status[s.name] = "up to date"
+                        print("%s: up to date" % s.name)
+                    # **NOTE** in a dry run, stages which depend on stale stages are also stale
+                    elif dry_run:
+                        status[s.name] = "stale"
+                        print("%s: stale" % s.name)
+                    else:
+                        print("%s: running" % s.name)
+                        running[executor.submit(s.run, log_dir)] = (s, signature)
+                ready = [s for s in pending if all(status.get(d) is not None for d in s.dependencies & names)]
+
+            # If nothing could be scheduled, wait for a running stage to finish
+            if len(running) == 0:
+                assert len(pending) == 0, "Stages %s have circular dependencies" % [s.name for s in pending]
+                continue
+            finished, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+            for f in finished:
+                s, signature = running.pop(f)
+                result, log_filename = f.result()
+                if result == 0:
+                    # Record signature and hash of outputs
+                    status[s.name] = "built"
+                    stage_states[s.name] = {"signature": signature,
+                                            "outputs": {o: hash_file(o, hash_cache) for o in expand(s.outputs)}}
+                    print("%s: built" % s.name)
+                else:
+                    status[s.name] = "failed"
+                    stage_states.pop(s.name, None)
+                    print("%s: FAILED (see %s)" % (s.name, log_filename))
+
+    return all(v != "failed" for v in status.values())
+
+if __name__ == '__main__':
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+
+    # **NOTE** all paths in stages are relative to this directory
+    script_dir = path.dirname(path.abspath(__file__))
+    config_filename = path.abspath(options.get("config", path.join(script_dir, "figures.json")))
+    state_filename = path.abspath(options.get("state", path.join(script_dir, ".build_figures_state.json")))
+
+    # Load dataset configuration if present
+    config = {}
+    if path.exists(config_filename):
+        with open(config_filename, "r") as f:
+            config = json.load(f)
+
+    # Load state of previous builds
+    state = {}
+    if path.exists(state_filename):
+        with open(state_filename, "r") as f:
+            state = json.load(f)
+
+    chdir(script_dir)
+    stages = select_stages(get_stages(config), args)
+
+    # If stages should just be listed
+    if "list" in options:
+        for s in stages:
+            print("%s <- %s" % (s.name, ", ".join(sorted(s.dependencies)) if len(s.dependencies) > 0 else "(sources)"))
+        exit(0)
+
+    success = build(stages, state, int(options.get("jobs", 4)), "force" in options, "dry-run" in options,
+                    options.get("log-dir", "build_logs"))
+
+    # Write state after every build so successful stages aren't rebuilt
+    if "dry-run" not in options:
+        with open(state_filename, "w") as f:
+            json.dump(state, f, indent=4)
+
+    exit(0 if success else 1)
@@ -0,0 +1,206 @@
+import numpy as np
+from os import path
+from sys import argv
+
+# Population and statistic names
+populations = ["4E", "4I", "5E", "5I", "6E", "6I", "23E", "23I"]
+statistics = ["rates", "irregularity", "corr_coeff"]
+
+def load_area_stats(folder, pop_name):
+    # Load per-area value counts written by calc_multi_area_stats.py
+    area_names = list(np.load(path.join(folder, "areas_%s.npy" % pop_name)))
+    area_counts = np.load(path.join(folder, "area_counts_%s.npy" % pop_name))
+
+    # Split each statistic back into areas
+    area_stats = {}
+    for i, s in enumerate(statistics):
+        values = np.load(path.join(folder, "%s_%s.npy" % (s, pop_name)))
+        assert len(values) == np.sum(area_counts[:, i])
+        for a, v in zip(area_names, np.split(values, np.cumsum(area_counts[:-1, i]))):
+            area_stats[(a, s)] = v
+    return area_names, area_stats
+
+def merge_cells(ground_truth_cells, comparison_cells):
+    # Concatenate values of all cells, tagged with their cell and whether they are from the comparison
+    gt_counts = np.asarray([len(c) for c in ground_truth_cells], dtype=np.int64)
+    comp_counts = np.asarray([len(c) for c in comparison_cells], dtype=np.int64)
+    values = np.concatenate([np.asarray(c, dtype=np.float64) for c in ground_truth_cells + comparison_cells])
+    cell_index = np.arange(len(gt_counts), dtype=np.min_scalar_type(len(gt_counts)))
+    cell = np.concatenate((np.repeat(cell_index, gt_counts), np.repeat(cell_index, comp_counts)))
+    comparison = np.concatenate((np.zeros(np.sum(gt_counts), dtype=np.int8),
+                                 np.ones(np.sum(comp_counts), dtype=np.int8)))
+
+    # Sort everything at once by cell, then value - equivalent to np.lexsort((values, cell)) but, as the stable
+    # sort of small cell indices is a radix sort, several times faster than stable sorting the values
+    # **NOTE** the order of tied values doesn't matter as ECDFs are only evaluated after the last of them
+    order = np.argsort(values)
+    order = order[np.argsort(cell[order], kind="stable")]
+    return values[order], comparison[order], gt_counts, comp_counts
+
+def calc_percentiles(sorted_values, counts, starts, q):
+    # Linearly-interpolated percentile of each cell (matching np.percentile)
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    frac = position - lower
+    return ((1.0 - frac) * sorted_values[starts + lower]) + (frac * sorted_values[starts + upper])
+
+def calc_distances(ground_truth_cells, comparison_cells):
+    """
+    Calculate two-sample KS statistic, Wasserstein distance and KL divergence
+    between each pair of ground truth and comparison cells at once.
+
+    Parameters
+    ----------
+    ground_truth_cells : list of 1D arrays
+    comparison_cells : list of 1D arrays, same length as ground_truth_cells
+
+    Returns
+    -------
+    ks, wasserstein, kl : arrays with one entry per cell
+    """
+    num_cells = len(ground_truth_cells)
+    values, comparison, gt_counts, comp_counts = merge_cells(list(ground_truth_cells), list(comparison_cells))
+    counts = gt_counts + comp_counts
+    starts = np.zeros(num_cells, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+
+    # Count comparison samples up to and including each merged sample within its cell
+    # **NOTE** cumulative sum is over all cells so subtract total of all preceding cells
+    comp_totals = np.add.reduceat(comparison, starts, dtype=np.int64)
+    comp_ecdf = np.cumsum(comparison, dtype=np.int64) - np.repeat(np.cumsum(comp_totals) - comp_totals, counts)
+    gt_ecdf = (np.arange(1, len(values) + 1) - np.repeat(starts, counts)) - comp_ecdf
+
+    # Difference between ECDFs at each merged sample follows directly from these counts
+    abs_ecdf_diff = np.abs((gt_ecdf / np.repeat(gt_counts.astype(np.float64), counts))
+                           - (comp_ecdf / np.repeat(comp_counts.astype(np.float64), counts)))
+
+    # The ECDFs are only evaluated after the last of any tied values and at the end of each cell
+    last_in_cell = np.zeros(len(values), dtype=bool)
+    last_in_cell[starts + counts - 1] = True
+    last_of_value = last_in_cell.copy()
+    last_of_value[:-1] |= (values[1:] != values[:-1])
+    ks = np.maximum.reduceat(np.where(last_of_value, abs_ecdf_diff, 0.0), starts)
+
+    # Wasserstein distance is the area between ECDFs
+    # **NOTE** tied values contribute zero width so only the last of each is counted
+    width = np.zeros(len(values))
+    width[:-1] = values[1:] - values[:-1]
+    width[last_in_cell] = 0.0
+    wasserstein = np.add.reduceat(abs_ecdf_diff * width, starts)
+
+    # Extract each side's values, which remain sorted within each cell
+    gt_values = values[comparison == 0]
+    gt_cell = np.repeat(np.arange(num_cells), gt_counts)
+    comp_values = values[comparison == 1]
+    comp_cell = np.repeat(np.arange(num_cells), comp_counts)
+    gt_starts = np.zeros(num_cells, dtype=np.int64)
+    np.cumsum(gt_counts[:-1], out=gt_starts[1:])
+
+    # Calculate bin-size using Freedman-Diaconis rule on ground truth, as in calc_pairwise_histograms.py
+    iqr = (calc_percentiles(gt_values, gt_counts, gt_starts, 0.75)
+           - calc_percentiles(gt_values, gt_counts, gt_starts, 0.25))
+    bin_size = (2.0 * iqr) / (gt_counts.astype(np.float64) ** (1.0 / 3.0))
+
+    # Thus determine shared bins - evenly-spaced edges between ground truth minimum and maximum
+    # **NOTE** like calc_pairwise_histograms.py, cells with only two edges get a single bin, whose KL
+    # divergence is zero. Cells with zero IQR or range, which calc_pairwise_histograms.py can't bin, are treated the same
+    min_y = gt_values[gt_starts]
+    max_y = gt_values[gt_starts + gt_counts - 1]
+    valid = (bin_size > 0.0) & (max_y > min_y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        num_edges = np.where(valid, np.ceil((max_y - min_y) / bin_size), 2).astype(np.int64)
+    valid &= (num_edges > 2)
+    num_bins = np.where(valid, num_edges - 1, 1)
+    bin_width = np.where(valid, (max_y - min_y) / np.maximum(num_bins, 1), 1.0)
+    bin_starts = np.zeros(num_cells, dtype=np.int64)
+    np.cumsum(num_bins[:-1], out=bin_starts[1:])
+    bin_cell = np.repeat(np.arange(num_cells), num_bins)
+
+    def histogram(sorted_values, sorted_cell):
+        # Find bin of each value within its cell, with maximum in last bin and values outside range discarded
+        local_bin = np.floor((sorted_values - min_y[sorted_cell]) / bin_width[sorted_cell]).astype(np.int64)
+        local_bin[sorted_values == max_y[sorted_cell]] = num_bins[sorted_cell][sorted_values == max_y[sorted_cell]] - 1
+        inside = (local_bin >= 0) & (local_bin < num_bins[sorted_cell])
+        return np.bincount(bin_starts[sorted_cell[inside]] + local_bin[inside],
+                           minlength=np.sum(num_bins)).astype(np.float64)
+
+    gt_hist = histogram(gt_values, gt_cell)
+    comp_hist = histogram(comp_values, comp_cell)
+
+    # Normalise histograms and mask out bins with no comparison data, as in plot_multi_area_kl_divergence.py
+    # **NOTE** if no bins remain, KL divergence is zero like scipy.stats.entropy of empty histograms
+    with np.errstate(divide="ignore", invalid="ignore"):
+        comp_hist /= np.bincount(bin_cell, weights=comp_hist, minlength=num_cells)[bin_cell]
+        mask = (comp_hist > 1.0E-15)
+        gt_hist = np.where(mask, gt_hist, 0.0)
+        comp_hist = np.where(mask, comp_hist, 0.0)
+        gt_hist /= np.bincount(bin_cell, weights=gt_hist, minlength=num_cells)[bin_cell]
+        comp_hist /= np.bincount(bin_cell, weights=comp_hist, minlength=num_cells)[bin_cell]
+        kl_terms = np.where(gt_hist > 0.0, gt_hist * np.log(gt_hist / comp_hist), 0.0)
+    kl = np.bincount(bin_cell, weights=kl_terms, minlength=num_cells)
+
+    return ks, wasserstein, kl
+
+def calc_batched_distances(ground_truth_cells, comparison_cells, max_batch_values=1 << 22):
+    # Group consecutive cells into batches so memory used by calc_distances is bounded
+    # **NOTE** correlation coefficient cells are large so typically get a batch each
+    batches = [[]]
+    batch_values = 0
+    for i, (g, c) in enumerate(zip(ground_truth_cells, comparison_cells)):
+        if len(batches[-1]) > 0 and (batch_values + len(g) + len(c)) > max_batch_values:
+            batches.append([])
+            batch_values = 0
+        batches[-1].append(i)
+        batch_values += len(g) + len(c)
+
+    # Calculate distances for each batch and concatenate
+    distances = [calc_distances([ground_truth_cells[i] for i in b], [comparison_cells[i] for i in b])
+                 for b in batches if len(b) > 0]
+    return tuple(np.concatenate([d[j] for d in distances]) if len(distances) > 0 else np.zeros(0)
+                 for j in range(3))
+
+if __name__ == '__main__':
+    assert len(argv) >= 3
+    ground_truth_folder = argv[1]
+    comparison_folder = argv[2]
+
+    # Load per-area statistics from both folders
+    ground_truth = {}
+    comparison = {}
+    area_names = set()
+    for p in populations:
+        gt_areas, gt_stats = load_area_stats(ground_truth_folder, p)
+        comp_areas, comp_stats = load_area_stats(comparison_folder, p)
+        area_names.update(gt_areas)
+        area_names.update(comp_areas)
+        ground_truth.update({(a, p, s): v for (a, s), v in gt_stats.items()})
+        comparison.update({(a, p, s): v for (a, s), v in comp_stats.items()})
+    area_names = sorted(area_names)
+
+    # Build list of cells with data in both folders
+    keys = [(a, p, s) for a in area_names for p in populations for s in statistics
+            if len(ground_truth.get((a, p, s), [])) > 0 and len(comparison.get((a, p, s), [])) > 0]
+    print("Comparing %u cells" % len(keys))
+
+    # Calculate distances for all cells in batches
+    ks, wasserstein, kl = calc_batched_distances([ground_truth[k] for k in keys], [comparison[k] for k in keys])
+
+    # Scatter into (area, population, statistic) matrices, leaving missing cells as NaN
+    shape = (len(area_names), len(populations), len(statistics))
+    indices = tuple(np.asarray([(area_names.index(a), populations.index(p), statistics.index(s))
+                                for a, p, s in keys], dtype=np.int64).reshape(-1, 3).T)
+    matrices = {}
+    for name, distance in (("ks", ks), ("wasserstein", wasserstein), ("kl", kl)):
+        matrices[name] = np.full(shape, np.nan)
+        matrices[name][indices] = distance
+
+    # Write matrices alongside their axis labels
+    output_filename = path.basename(path.normpath(ground_truth_folder)) + "_" + path.basename(path.normpath(comparison_folder)) + "_accuracy.npz"
+    np.savez(output_filename, areas=np.asarray(area_names, dtype=str), populations=np.asarray(populations, dtype=str),
+             statistics=np.asarray(statistics, dtype=str), **matrices)
+
+    # Show worst cells by KS statistic
+    worst = np.argsort(-ks)[:10]
+    for w in worst:
+        print("%s %s %s: KS=%f, W=%f, KL=%f" % (keys[w] + (ks[w], wasserstein[w], kl[w])))
@@ -1,19 +1,57 @@
 from glob import glob
 from correlation_toolbox import helper as ch
 from pandas import read_csv
+from prefetch import prefetch_units
+from scipy.sparse import csr_matrix
+from functools import partial
 from multiprocessing import Process
 import h5py
 import json
 import numpy as np
-from os import path
+import profiling
+from os import makedirs, path
 from six import iteritems
-from sys import argv
+from spike_codec import read_spikes
+from spike_store import load_store_index, load_store_spikes
+from sys import argv, exit
+from time import sleep, time
 
-def calc_rate(data_array, t_min, t_max, num_neur, start_id=0):
-    hist, _ = np.histogram(data_array[1][data_array[0] > t_min], bins=range(start_id, start_id + num_neur + 1))
+def get_timestep(t, dt):
+    # Convert time to the nearest timestep so compact spikes can be compared exactly
+    return int(round(t / dt))
+
+def compact_spikes(data, dt, rtol=1E-3):
+    """
+    Convert (2, N) array of spike times and neuron ids into (2, N) uint32
+    array of timesteps and neuron ids. Spikes are emitted on timesteps so this
+    takes half the memory of float64 data without changing the analysis, but
+    ValueError is raised if any time is more than rtol * dt from a timestep or
+    timesteps or ids don't fit in uint32.
+    """
+    times = np.asarray(data[0])
+    ids = np.asarray(data[1])
+    steps = np.rint(times / dt)
+    # **NOTE** times from text files are rounded so can't be required to be exactly steps * dt
+    if steps.size > 0 and np.amax(np.abs((steps * dt) - times)) > (rtol * dt):
+        raise ValueError("Spike times are not multiples of timestep %f" % dt)
+    if steps.size > 0 and (np.amin(steps) < 0 or np.amax(steps) >= 2 ** 32):
+        raise ValueError("Spike times are outside range of uint32 timesteps")
+    if ids.size > 0 and (np.amin(ids) < 0 or np.amax(ids) >= 2 ** 32):
+        raise ValueError("Neuron ids are outside range of uint32")
+    return np.vstack((steps.astype(np.uint32), ids.astype(np.uint32)))
+
+def load_compact_spikes(loader, dt, source, area_name, pop_name):
+    # Load spikes using another loader and convert to compact format
+    data, start_id = loader(source, area_name, pop_name)
+    return (None if data is None else compact_spikes(data, dt)), start_id
+
+def calc_rate(data_array, t_min, t_max, num_neur, start_id=0, dt=None):
+    # If spikes are compact, compare timesteps rather than times
+    first = t_min if dt is None else get_timestep(t_min, dt)
+    hist, _ = np.histogram(data_array[1][data_array[0] > first], bins=range(start_id, start_id + num_neur + 1))
     return np.divide(hist, (t_max - t_min) / 1000.0, dtype=float)
 
-def calc_LvR(data_array, t_ref, t_min, t_max, num_neur):
+def calc_LvR(data_array, t_ref, t_min, t_max, num_neur, dt=None):
     """
     Compute the LvR value of the given data_array.
     See Shinomoto et al. 2009 for details.
@@ -33,6 +71,8 @@ def calc_LvR(data_array, t_ref, t_min, t_max, num_neur):
         Number of recorded neurons. Needs to provided explicitly
         to avoid corruption of results by silent neurons not
         present in the given data.
+    dt : float
+        Timestep if data_array contains compact spikes.
 
     Returns
     -------
@@ -41,12 +81,14 @@ def calc_LvR(data_array, t_ref, t_min, t_max, num_neur):
     LvR : numpy.ndarray
         Single-cell LvR values
     """
-    i_min = np.searchsorted(data_array[0], t_min)
-    i_max = np.searchsorted(data_array[0], t_max)
+    i_min = np.searchsorted(data_array[0], t_min if dt is None else get_timestep(t_min, dt))
+    i_max = np.searchsorted(data_array[0], t_max if dt is None else get_timestep(t_max, dt))
     LvR = np.array([])
     data_array = data_array[:,i_min:i_max]
     for i in np.unique(data_array[1]):
-        intervals = np.diff(data_array[0, np.where(data_array[1] == i)[0]])
+        # **NOTE** if spikes are compact, intervals between timesteps are converted to ms in double precision
+        times = data_array[0, np.where(data_array[1] == i)[0]]
+        intervals = np.diff(times) if dt is None else np.diff(times.astype(np.int64)) * dt
         if intervals.size > 1:
             val = np.sum((1. - 4 * intervals[0:-1] * intervals[1:] / (intervals[0:-1] + intervals[
                          1:]) ** 2) * (1 + 4 * t_ref / (intervals[0:-1] + intervals[1:])))
@@ -57,7 +99,7 @@ def calc_LvR(data_array, t_ref, t_min, t_max, num_neur):
     #    LvR = np.append(LvR, np.zeros(num_neur - len(LvR)))
     return LvR
 
-def calc_correlations(data_array, t_min, t_max, subsample=2000, resolution=1.0):
+def calc_correlations(data_array, t_min, t_max, subsample=2000, resolution=1.0, dt=None):
     # Get unique neuron ids
     ids = np.unique(data_array[1])
 
@@ -66,9 +108,11 @@ def calc_correlations(data_array, t_min, t_max, subsample=2000, resolution=1.0):
     # modified to suit our data format
     # +1000 to ensure that we really have subsample non-silent neurons in the end
     ids = np.arange(ids[0], ids[0]+subsample+1001)
+    # **NOTE** if spikes are compact, timesteps are converted to times in double precision
     dat = []
     for i in ids:
-        dat.append(np.sort(data_array[0, np.where(data_array[1] == i)[0]]))
+        times = np.sort(data_array[0, np.where(data_array[1] == i)[0]])
+        dat.append(times if dt is None else times * dt)
 
     # Calculate correlation coefficient
     # **NOTE** this comes from the compute_corrcoeff.py in original paper repository
@@ -81,155 +125,318 @@ def calc_correlations(data_array, t_min, t_max, subsample=2000, resolution=1.0):
     # Return mean correlation coefficient
     return cc
 
-def calc_genn_stats(data_path, duration_s, population_name, population_sizes):
-    # Get list of all data files for this population
-    spike_files = list(glob(path.join(data_path, "recordings", "*_%s.npy" % population_name)))
-
-    rates = []
-    average_pop_rates = []
-    irregularity = []
-    average_pop_irregularity = []
-    correlation = []
-    average_pop_correlation = []
-    for i, s in enumerate(spike_files):
-        # Load spike data
-        data = np.load(s)
-
-        # Extract population name
-        name_components = path.basename(s).split("_")
-        area_name = name_components[0]
-        pop_name = name_components[1].split(".")[0]
-
-        # Count neurons
-        num_neurons = int(population_sizes[area_name][pop_name])
-
-        # Calculate rate
-        pop_rates = calc_rate(data, 500.0, duration_s * 1000.0, num_neurons)
-        rates.append(pop_rates)
-        average_pop_rates.append(np.average(pop_rates))
-
-        # Calculate irregularity
-        pop_LvR = calc_LvR(data, 2.0, 500.0, duration_s * 1000.0, num_neurons)
-        irregularity.append(pop_LvR)
-        average_pop_irregularity.append(np.average(pop_LvR))
-
-        # Calculate correlation coefficient
-        pop_correlation = calc_correlations(data, 500.0, duration_s * 1000.0)
-        correlation.append(pop_correlation)
-        average_pop_correlation.append(np.average(pop_correlation))
-
-    np.save("rates_%s.npy" % population_name, np.hstack(rates))
-    np.save("average_pop_rates_%s.npy" % population_name, np.asarray(average_pop_rates))
-    np.save("irregularity_%s.npy" % population_name, np.hstack(irregularity))
-    np.save("average_pop_irregularity_%s.npy" % population_name, np.asarray(average_pop_irregularity))
-    np.save("corr_coeff_%s.npy" % population_name, np.hstack(correlation))
-    np.save("average_pop_corr_coeff_%s.npy" % population_name, np.asarray(average_pop_correlation))
-
-def calc_hdf5_nest_stats(filename, duration_s, pop_name, population_sizes):
-    # Open file
-    data = h5py.File(filename, "r")
-
-    # Loop through all areas in data
-    rates = []
-    average_pop_rates = []
-    irregularity = []
-    average_pop_irregularity = []
-    correlation = []
-    average_pop_correlation = []
-    for area_name, area_data in iteritems(data):
-        # If there is data for this processes population in area
-        if pop_name in area_data:
-            # Transpose and roll data so it's same shape as GeNN
-            data = np.transpose(area_data[pop_name])
-            data = np.roll(data, 1, axis=0)
-            if data.shape[0] == 2:
+def calc_approx_correlations(data_array, t_min, t_max, num_neur, start_id=0, epsilon=0.01, delta=0.05,
+                             resolution=1.0, seed=1234, neuron_ids=None, subsample=None, dt=None):
+    """
+    Estimate the distribution of pairwise correlation coefficients between
+    the binned spike counts of all non-silent neurons in a population
+    by sampling random pairs, in time linear in the number of spikes.
+
+    Parameters
+    ----------
+    data_array : numpy.ndarray
+        Arrays with spike data.
+        column 0: spike times, column 1: neuron_ids
+    t_min : float
+        Minimal time for the calculation.
+    t_max : float
+        Maximal time for the calculation.
+    num_neur: int
+        Number of neurons in population.
+    start_id: int
+        Id of first neuron in population.
+    epsilon : float
+        Maximum error in the CDF of the estimated distribution.
+    delta : float
+        Probability of error exceeding epsilon.
+    resolution : float
+        Width of bins used to count spikes.
+    seed : int
+        Seed for selecting pairs.
+    neuron_ids : numpy.ndarray
+        Optional subset of neuron ids to sample pairs from.
+    subsample : int
+        Optional maximum number of non-silent neurons to sample
+        pairs from, selected in order of id like calc_correlations.
+    dt : float
+        Timestep if data_array contains compact spikes.
+
+    Returns
+    -------
+    cc : numpy.ndarray
+        Correlation coefficients of sampled pairs. By the
+        Dvoretzky-Kiefer-Wolfowitz inequality, their empirical CDF
+        is within epsilon of the CDF over all pairs with probability
+        1 - delta.
+    """
+    # Use same bins as correlation_toolbox.helper.instantaneous_spike_count
+    # **NOTE** like np.histogram, last bin is closed
+    bins = np.arange(t_min, t_max + resolution, resolution)
+    num_bins = len(bins) - 1
+    times = data_array[0] if dt is None else data_array[0] * dt
+    mask = (times >= bins[0]) & (times <= bins[-1])
+    bin_index = np.minimum(((times[mask] - t_min) // resolution).astype(np.int64), num_bins - 1)
+    neuron_index = data_array[1][mask].astype(np.int64) - start_id
+
+    # Count spikes in each non-empty (neuron, bin)
+    keys, counts = np.unique((neuron_index * num_bins) + bin_index, return_counts=True)
+    neuron_index = keys // num_bins
+    bin_index = keys % num_bins
+
+    # Calculate mean and variance of each neuron's binned spike train
+    mean = np.bincount(neuron_index, weights=counts, minlength=num_neur) / num_bins
+    var = (np.bincount(neuron_index, weights=counts ** 2, minlength=num_neur) / num_bins) - (mean ** 2)
+
+    # Select neurons whose binned spike trains aren't constant
+    # **NOTE** these are the trains retained by correlation_toolbox.helper.strip_binned_spiketrains
+    candidates = np.where(var > 1E-16)[0]
+    if neuron_ids is not None:
+        candidates = np.intersect1d(candidates, np.asarray(neuron_ids, dtype=np.int64) - start_id)
+    if subsample is not None:
+        candidates = candidates[:subsample]
+    if len(candidates) < 2:
+        return np.zeros(0)
+
+    # Sample enough distinct pairs to bound error using DKW inequality
+    num_pairs = int(np.ceil(np.log(2.0 / delta) / (2.0 * epsilon ** 2)))
+    rng = np.random.RandomState(seed)
+    i = rng.randint(0, len(candidates), num_pairs)
+    j = (i + rng.randint(1, len(candidates), num_pairs)) % len(candidates)
+    i = candidates[i]
+    j = candidates[j]
+
+    # Build sparse matrix of binned spike counts and calculate dot product of each pair's trains
+    counts = csr_matrix((counts, (neuron_index, bin_index)), shape=(num_neur, num_bins))
+    cross = np.asarray(counts[i].multiply(counts[j]).sum(axis=1)).flatten() / num_bins
+
+    # Calculate correlation coefficients
+    return (cross - (mean[i] * mean[j])) / np.sqrt(var[i] * var[j])
+
+def calc_stats(data, duration_s, num_neurons, start_id=0, approx_corr_epsilon=None, dt=None):
+    # Calculate rate
+    with profiling.stage("calc_rate"):
+        pop_rates = calc_rate(data, 500.0, duration_s * 1000.0, num_neurons, start_id, dt=dt)
+
+    # Calculate irregularity
+    with profiling.stage("calc_LvR"):
+        pop_LvR = calc_LvR(data, 2.0, 500.0, duration_s * 1000.0, num_neurons, dt=dt)
+
+    # Calculate correlation coefficient, approximating distribution over whole population if required
+    with profiling.stage("calc_correlations"):
+        if approx_corr_epsilon is None:
+            pop_correlation = calc_correlations(data, 500.0, duration_s * 1000.0, dt=dt)
+        else:
+            pop_correlation = calc_approx_correlations(data, 500.0, duration_s * 1000.0, num_neurons, start_id,
+                                                       epsilon=approx_corr_epsilon, dt=dt)
+
+    # If spikes are compact, statistics are calculated in double precision but stored in single
+    if dt is not None:
+        return pop_rates.astype(np.float32), pop_LvR.astype(np.float32), pop_correlation.astype(np.float32)
+    else:
+        return pop_rates, pop_LvR, pop_correlation
+
+def save_stats(pop_name, area_names, stats):
+    # Split list of per-area (rates, irregularity, correlation) tuples
+    rates = [s[0] for s in stats]
+    irregularity = [s[1] for s in stats]
+    correlation = [s[2] for s in stats]
+
+    # Average in double precision but save averages with the same precision as the statistics
+    # **NOTE** this matches np.average if statistics are float64
+    def average(values):
+        return np.asarray([np.mean(v, dtype=np.float64) for v in values],
+                          dtype=values[0].dtype if len(values) > 0 else np.float64)
+
+    with profiling.stage("save", pop=pop_name):
+        # Save names of areas and how many values each contributes to each statistic
+        # **NOTE** this allows per-neuron statistics to be split back into areas
+        np.save("areas_%s.npy" % pop_name, np.asarray(area_names, dtype=str))
+        np.save("area_counts_%s.npy" % pop_name,
+                np.asarray([[len(r), len(i), len(c)] for r, i, c in stats], dtype=np.int64).reshape(-1, 3))
+        np.save("rates_%s.npy" % pop_name, np.hstack(rates))
+        np.save("average_pop_rates_%s.npy" % pop_name, average(rates))
+        np.save("irregularity_%s.npy" % pop_name, np.hstack(irregularity))
+        np.save("average_pop_irregularity_%s.npy" % pop_name, average(irregularity))
+        np.save("corr_coeff_%s.npy" % pop_name, np.hstack(correlation))
+        np.save("average_pop_corr_coeff_%s.npy" % pop_name, average(correlation))
+
+def get_work_units(population_sizes, populations):
+    # Build sorted list of (area, population) pairs which contain neurons
+    return sorted((a, p) for a, s in iteritems(population_sizes)
+                  for p in populations if int(s.get(p, 0)) > 0)
+
+def load_genn_spikes(data_path, area_name, pop_name):
+    # Load spike data if there is any
+    spike_file = path.join(data_path, "recordings", "%s_%s.npy" % (area_name, pop_name))
+    if path.exists(spike_file):
+        return np.load(spike_file), 0
+    else:
+        return None, 0
+
+def load_compressed_genn_spikes(data_path, area_name, pop_name):
+    # If spike data has been compressed, decode it, otherwise fall back to raw spike data
+    # **NOTE** decoding is slower than np.load from a warm cache so this is only
+    # worthwhile if reading is limited by a slow filesystem
+    spike_file = path.join(data_path, "recordings", "%s_%s.spk" % (area_name, pop_name))
+    if path.exists(spike_file):
+        return read_spikes(spike_file), 0
+    else:
+        return load_genn_spikes(data_path, area_name, pop_name)
+
+def load_hdf5_nest_spikes(filename, area_name, pop_name):
+    with h5py.File(filename, "r") as data:
+        # If there is no data for this population in area
+        if area_name not in data or pop_name not in data[area_name]:
+            return None, 0
+
+        # Transpose and roll data so it's same shape as GeNN
+        spikes = np.transpose(data[area_name][pop_name])
+        spikes = np.roll(spikes, 1, axis=0)
+
+    if spikes.shape[0] != 2:
+        print("WARNING %s:%s data shape %u, %u" % (area_name, pop_name, spikes.shape[0], spikes.shape[1]))
+        return None, 0
+    elif spikes.shape[1] == 0:
+        return None, 0
+
+    # **NOTE** don't have any network_gids.txt files so minimum neuron id will have to do
+    return spikes, int(np.amin(spikes[1]))
+
+def load_gdf_nest_spikes(data_path, area_name, pop_name):
+    # Get list of all data files for this population i.e. one per rank
+    spike_files = sorted(glob(path.join(data_path, "*_spikes-%s-%s-*-*.gdf" % (area_name, pop_name))))
+    if len(spike_files) == 0:
+        return None, 0
+
+    # Load spike data using pandas to improve performance
+    # **NOTE** we need usecols becauses lines have a trailing delimiter which pandas thinks is another column
+    data = [read_csv(s, names=["id", "time"], skiprows=0, usecols=[0,1], delimiter="\t", 
+                     dtype={"id":np.uint64, "time":np.float64}, engine="c")
+            for s in spike_files]
+
+    # Stack data back into same shape as GeNN
+    spikes = np.vstack((np.concatenate([d["time"] for d in data]),
+                        np.concatenate([d["id"] for d in data])))
+    if spikes.shape[1] == 0:
+        return None, 0
+
+    # If data came from multiple ranks, merge into time order
+    if len(spike_files) > 1:
+        spikes = spikes[:, np.argsort(spikes[0], kind="stable")]
+
+    # **NOTE** don't have any network_gids.txt files so minimum neuron id will have to do
+    return spikes, int(np.amin(spikes[1]))
+
+def calc_unit_stats(loader, source, duration_s, units, population_sizes, stats_kwargs={}, prefetch_kwargs={}):
+    # Load units in order, prefetching them on a background thread if required
+    if len(prefetch_kwargs) > 0:
+        loaded_units = prefetch_units(loader, source, units, **prefetch_kwargs)
+    else:
+        loaded_units = (loader(source, a, p) for a, p in units)
+
+    # Loop through work units
+    for area_name, pop_name in units:
+        with profiling.stage("task", area_name, pop_name):
+            # Load spike data
+            with profiling.stage("load"):
+                data, start_id = next(loaded_units)
+
+            # Skip populations with no spikes after first 500ms
+            dt = stats_kwargs.get("dt")
+            if data is None or not np.any(data[0] > (500.0 if dt is None else get_timestep(500.0, dt))):
+                stats = None
+            else:
                 # Count neurons
                 num_neurons = int(population_sizes[area_name][pop_name])
 
-                # Calculate rate
-                # **NOTE** don't have any network_gids.txt files so minimum neuron id will have to do
-                pop_rates = calc_rate(data, 500.0, duration_s * 1000.0, num_neurons, int(np.amin(data[1])))
-                rates.append(pop_rates)
-                average_pop_rates.append(np.average(pop_rates))
-
-                # Calculate irregularity
-                pop_LvR = calc_LvR(data, 2.0, 500.0, duration_s * 1000.0, num_neurons)
-                irregularity.append(pop_LvR)
-                average_pop_irregularity.append(np.average(pop_LvR))
-
-                # Calculate correlation coefficient
-                pop_correlation = calc_correlations(data, 500.0, duration_s * 1000.0)
-                correlation.append(pop_correlation)
-                average_pop_correlation.append(np.average(pop_correlation))
+                stats = calc_stats(data, duration_s, num_neurons, start_id, **stats_kwargs)
+
+        yield area_name, pop_name, stats
+
+def calc_population_stats(loader, source, duration_s, pop_name, population_sizes, stats_kwargs={}, prefetch_kwargs={}):
+    # Calculate stats for every area containing population
+    units = get_work_units(population_sizes, [pop_name])
+    area_stats = [(a, s) for a, _, s in calc_unit_stats(loader, source, duration_s, units, population_sizes,
+                                                        stats_kwargs, prefetch_kwargs)
+                  if s is not None]
+
+    save_stats(pop_name, [a for a, _ in area_stats], [s for _, s in area_stats])
+    profiling.write_records()
+
+def calc_shard_stats(loader, source, duration_s, units, population_sizes, shard_dir, 
+                     stats_kwargs={}, prefetch_kwargs={}):
+    for area_name, pop_name, stats in calc_unit_stats(loader, source, duration_s, units,
+                                                      population_sizes, stats_kwargs, prefetch_kwargs):
+        # Write partial output for unit
+        # **NOTE** units with no data are still written so merging can check every unit was processed
+        with profiling.stage("save", area_name, pop_name):
+            if stats is None:
+                np.savez(path.join(shard_dir, "%s_%s.npz" % (area_name, pop_name)), valid=False)
             else:
-                print("WARNING %s:%s data shape %u, %u" % (area_data, pop_name, data.shape[0], data.shape[1]))
-
-    np.save("rates_%s.npy" % pop_name, np.hstack(rates))
-    np.save("average_pop_rates_%s.npy" % pop_name, np.asarray(average_pop_rates))
-    np.save("irregularity_%s.npy" % pop_name, np.hstack(irregularity))
-    np.save("average_pop_irregularity_%s.npy" % pop_name, np.asarray(average_pop_irregularity))
-    np.save("corr_coeff_%s.npy" % pop_name, np.hstack(correlation))
-    np.save("average_pop_corr_coeff_%s.npy" % pop_name, np.asarray(average_pop_correlation))
-
-
-def calc_gdf_nest_stats(data_path, duration_s, pop_name, population_sizes):
-    # Get list of all data files for this population
-    spike_files = list(glob(path.join(data_path, "*_spikes-*-%s-*-*.gdf" % pop_name)))
-
-    rates = []
-    average_pop_rates = []
-    irregularity = []
-    average_pop_irregularity = []
-    correlation = []
-    average_pop_correlation = []
-    for i, s in enumerate(spike_files):
-        # Load spike data using pandas to improve performance
-        # **NOTE** we need usecols becauses lines have a trailing delimiter which pandas thinks is another column
-        data = read_csv(s, names=["id", "time"], skiprows=0, usecols=[0,1], delimiter="\t", 
-                        dtype={"id":np.uint64, "time":np.float64}, engine="c")
-
-        # Stack data back into same shape as GeNN
-        data = np.vstack((data["time"], data["id"]))
-
-        # Extract population name
-        name_components = path.basename(s).split("-")
-        area_name = name_components[1]
-
-        # Count neurons
-        num_neurons = int(population_sizes[area_name][pop_name])
-
-        # Count spikes that occur after first 500ms
-        num_spikes = np.sum(data[0] > 500.0)
-        if num_spikes > 0:
-            # Calculate rate
-            # **NOTE** don't have any network_gids.txt files so minimum neuron id will have to do
-            pop_rates = calc_rate(data, 500.0, duration_s * 1000.0, num_neurons, int(np.amin(data[1])))
-            rates.append(pop_rates)
-            average_pop_rates.append(np.average(pop_rates))
-
-
-            # Calculate irregularity
-            pop_LvR = calc_LvR(data, 2.0, 500.0, duration_s * 1000.0, num_neurons)
-            irregularity.append(pop_LvR)
-            average_pop_irregularity.append(np.average(pop_LvR))
-            
-            # Calculate correlation coefficient
-            pop_correlation = calc_correlations(data, 500.0, duration_s * 1000.0)
-            correlation.append(pop_correlation)
-            average_pop_correlation.append(np.average(pop_correlation))
-
-    np.save("rates_%s.npy" % pop_name, np.hstack(rates))
-    np.save("average_pop_rates_%s.npy" % pop_name, np.asarray(average_pop_rates))
-    np.save("irregularity_%s.npy" % pop_name, np.hstack(irregularity))
-    np.save("average_pop_irregularity_%s.npy" % pop_name, np.asarray(average_pop_irregularity))
-    np.save("corr_coeff_%s.npy" % pop_name, np.hstack(correlation))
-    np.save("average_pop_corr_coeff_%s.npy" % pop_name, np.asarray(average_pop_correlation))
-
+                np.savez(path.join(shard_dir, "%s_%s.npz" % (area_name, pop_name)), valid=True,
+                         rates=stats[0], irregularity=stats[1], corr_coeff=stats[2])
+
+    profiling.write_records()
+
+def is_npy_complete(filename):
+    # Read header to determine how large file should be once it has been completely written
+    # **NOTE** np.save writes the header before the data so a partially-written file will be too short
+    try:
+        with open(filename, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran_order, dtype = read_header(f)
+            data_offset = f.tell()
+    except (IOError, OSError, ValueError):
+        return False
+
+    return path.getsize(filename) == (data_offset + (int(np.prod(shape)) * dtype.itemsize))
+
+def watch_genn_stats(loader, data_path, duration_s, population_name, population_sizes, poll_interval_s,
+                     timeout_s=None, stats_kwargs={}):
+    # Get list of areas which should produce data for this population
+    expected_areas = sorted(a for a, p in iteritems(population_sizes)
+                            if int(p.get(population_name, 0)) > 0)
+
+    # Poll recordings directory until stats have been calculated for all areas
+    area_stats = {}
+    last_progress_time = time()
+    while len(area_stats) < len(expected_areas):
+        found_new = False
+        for a in expected_areas:
+            # If we haven't already processed this area and its spike file is complete
+            spike_file = path.join(data_path, "recordings", "%s_%s.npy" % (a, population_name))
+            if a not in area_stats and path.exists(spike_file) and is_npy_complete(spike_file):
+                # Load data and calculate stats in the same way as when data is processed afterwards
+                # **NOTE** this skips populations with no spikes after the first 500ms
+                _, _, area_stats[a] = next(calc_unit_stats(loader, data_path, duration_s, [(a, population_name)],
+                                                           population_sizes, stats_kwargs))
+                found_new = True
+                last_progress_time = time()
+                print("%s: processed %s (%u/%u)" % (population_name, a, len(area_stats), len(expected_areas)))
+
+        # If nothing new was found, wait before polling again
+        if not found_new and len(area_stats) < len(expected_areas):
+            # If no new recordings have been completed for too long, give up
+            if timeout_s is not None and (time() - last_progress_time) > timeout_s:
+                print("%s: no recordings completed for %.0fs, missing areas: %s"
+                      % (population_name, timeout_s, ", ".join(a for a in expected_areas if a not in area_stats)))
+                exit(1)
+            sleep(poll_interval_s)
+
+    # Finalise outputs, excluding areas with no spikes after first 500ms
+    valid_areas = [a for a in expected_areas if area_stats[a] is not None]
+    save_stats(population_name, valid_areas, [area_stats[a] for a in valid_areas])
+    profiling.write_records()
 
 if __name__ == '__main__':
-    assert len(argv) >= 3
-    data_path = argv[1]
-    duration_s = float(argv[2])
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    assert len(args) >= 2
+    data_path = args[0]
+    duration_s = float(args[1])
 
     # Find model description
     custom_data_model_filename = list(glob(path.join(data_path, "custom_Data_Model_*.json")))
@@ -245,32 +452,138 @@ if __name__ == '__main__':
     # Population names
     populations = ["4E", "4I", "5E", "5I", "6E", "6I", "23E", "23I"]
 
+    # If data has been converted to a spike store
+    if "store" in options:
+        source = path.join(data_path, "spike_store") if options["store"] is True else options["store"]
+        loader = load_store_spikes
+        print("Processing %s data from spike store %s" % (load_store_index(source)["simulator"], source))
     # If a NEST data file is passed
-    if len(argv) > 3:
+    elif len(args) > 2:
+        source = args[2]
+
         # If data is in HDF5 format
-        if argv[3].endswith(".hdf5"):
+        if source.endswith(".hdf5"):
             print("Processing NEST HDF5 data")
-
-            # Create processes to calculate stats for each population
-            processes = [Process(target=calc_hdf5_nest_stats, args=(argv[3], duration_s, p, population_sizes)) 
-                         for p in populations]
+            loader = load_hdf5_nest_spikes
         else:
             print("Processing NEST GDF data")
-
-            # Create processes to calculate stats for each population
-            processes = [Process(target=calc_gdf_nest_stats, args=(argv[3], duration_s, p, population_sizes)) 
-                         for p in populations]
+            loader = load_gdf_nest_spikes
+    # If compressed GeNN data should be read in preference to raw data
+    elif "spk" in options:
+        print("Processing compressed GeNN data")
+        source = data_path
+        loader = load_compressed_genn_spikes
     else:
         print("Processing GeNN data");
-
-        # Create processes to calculate stats for each population
-        processes = [Process(target=calc_genn_stats, args=(data_path, duration_s, p, population_sizes)) 
-                     for p in populations]
-
-    # Start processes
-    for p in processes:
-        p.start()
-
-    # Join processes
-    for p in processes:
-        p.join()
+        source = data_path
+        loader = load_genn_spikes
+
+    # If profiling is requested, enable it before starting processes so they inherit it
+    if "profile" in options:
+        profiling.enable("profile" if options["profile"] is True else options["profile"])
+
+    # If we should estimate distribution of correlations over whole populations rather than subsample
+    stats_kwargs = {}
+    if "approx-corr" in options:
+        stats_kwargs["approx_corr_epsilon"] = float(options.get("corr-epsilon", 0.01))
+        print("Approximating correlation coefficient distributions with epsilon=%f" 
+              % stats_kwargs["approx_corr_epsilon"])
+
+    # If spikes should be converted to uint32 timesteps and ids as they are loaded and statistics saved as float32
+    # **NOTE** loader is wrapped before spikes are prefetched or loaded into shared memory so both hold compact data
+    if "compact" in options:
+        stats_kwargs["dt"] = 0.1 if options["compact"] is True else float(options["compact"])
+        loader = partial(load_compact_spikes, loader, stats_kwargs["dt"])
+        print("Using compact spikes with dt=%f ms" % stats_kwargs["dt"])
+
+    # If next units should be loaded in the background while current one is processed
+    prefetch_kwargs = {}
+    if "prefetch" in options:
+        prefetch_kwargs["depth"] = 2 if options["prefetch"] is True else int(options["prefetch"])
+        if "prefetch-max-mb" in options:
+            prefetch_kwargs["max_bytes"] = int(float(options["prefetch-max-mb"]) * 1024 * 1024)
+        print("Prefetching %u units ahead" % prefetch_kwargs["depth"])
+
+    # Get work units, deterministically assigning them to shards in round-robin order if required
+    units = get_work_units(population_sizes, populations)
+    if "shard" in options:
+        shard_index, num_shards = (int(i) for i in options["shard"].split("/"))
+        assert shard_index < num_shards
+        units = units[shard_index::num_shards]
+
+    # If spike data should be loaded once into shared memory which processes attach to
+    shared_pool = None
+    if "shared-memory" in options:
+        assert "watch" not in options
+        from shared_spikes import SharedSpikePool, load_shared_spikes, run_detaching_shared_spikes
+
+        # **NOTE** if loading fails, the pool unlinks any blocks it has already created
+        shared_pool = SharedSpikePool()
+        shared_pool.load(loader, source, units)
+        loader = load_shared_spikes
+        source = shared_pool.descriptors
+        print("Loaded %u populations into shared memory" % len(source))
+
+    try:
+        # If we should only process one shard of the work units
+        if "shard" in options:
+            shard_dir = options.get("shard-dir", "shards")
+            if not path.exists(shard_dir):
+                makedirs(shard_dir)
+            print("Processing shard %u/%u: %u work units" % (shard_index, num_shards, len(units)))
+
+            # Calculate stats for subset of shard's units in each process
+            num_processes = int(options.get("processes", len(populations)))
+            target = calc_shard_stats
+            process_args = [(loader, source, duration_s, units[i::num_processes], population_sizes, shard_dir,
+                             stats_kwargs, prefetch_kwargs)
+                            for i in range(num_processes)]
+        # If we should process GeNN data as it is written
+        elif "watch" in options:
+            assert source == data_path and "store" not in options
+            poll_interval_s = float(options.get("poll-interval", 10.0))
+            timeout_s = float(options.get("watch-timeout", 3600.0))
+            print("Watching for GeNN data")
+
+            # Calculate stats for each population in its own process as its recordings are completed
+            target = watch_genn_stats
+            process_args = [(loader, data_path, duration_s, p, population_sizes, poll_interval_s,
+                             timeout_s, stats_kwargs)
+                            for p in populations]
+        else:
+            # Calculate stats for each population in its own process
+            target = calc_population_stats
+            process_args = [(loader, source, duration_s, p, population_sizes, stats_kwargs, prefetch_kwargs)
+                            for p in populations]
+
+        # Create processes, making them detach from shared memory when they finish, even if they fail
+        if shared_pool is not None:
+            processes = [Process(target=run_detaching_shared_spikes, args=(target,) + a) for a in process_args]
+        else:
+            processes = [Process(target=target, args=a) for a in process_args]
+
+        # Start processes
+        for p in processes:
+            p.start()
+
+        # Join processes
+        for p in processes:
+            p.join()
+    finally:
+        # Free any shared memory once processes no longer need it
+        if shared_pool is not None:
+            shared_pool.close()
+
+    # Merge profiling records from all processes and write report
+    profiling.write_report()
+
+    # If all processes succeeded and we're processing a shard, write manifest to mark it as complete
+    if "shard" in options and all(p.exitcode == 0 for p in processes):
+        with open(path.join(shard_dir, "shard_%u_of_%u.json" % (shard_index, num_shards)), "w") as f:
+            json.dump({"shard": shard_index, "num_shards": num_shards,
+                       "populations": populations, "units": units}, f)
+
+    # Exit with error if any process failed e.g. watched recordings were never completed
+    if any(p.exitcode != 0 for p in processes):
+        print("%u processes failed" % sum(p.exitcode != 0 for p in processes))
+        exit(1)
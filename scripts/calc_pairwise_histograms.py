@@ -13,6 +13,10 @@ if __name__ == '__main__':
     for s in glob(path.join(ground_truth_folder, "*.npy")):
         # Get name
         name = path.basename(s)
+
+        # Skip per-area bookkeeping rather than statistics
+        if name.startswith("areas_") or name.startswith("area_counts_"):
+            continue
         print(name)
 
         # Get path to corresponding file in comparison path
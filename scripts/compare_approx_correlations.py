@@ -0,0 +1,60 @@
+import json
+import numpy as np
+from glob import glob
+from os import path
+from sys import argv
+from time import perf_counter
+
+from calc_multi_area_stats import calc_approx_correlations, calc_correlations, load_genn_spikes
+
+# Compares the sampled correlation coefficient distribution against the exact one calculated
+# from the same subsample of neurons e.g. python compare_approx_correlations.py seed_1 10.5 V1 4E
+assert len(argv) >= 5
+data_path = argv[1]
+duration_s = float(argv[2])
+area_name = argv[3]
+pop_name = argv[4]
+epsilon = float(argv[5]) if len(argv) > 5 else 0.01
+delta = 0.05
+
+# Load population size from model description
+custom_data_model_filename = list(glob(path.join(data_path, "custom_Data_Model_*.json")))[0]
+with open(custom_data_model_filename, "r") as f:
+    num_neurons = int(json.load(f)["neuron_numbers"][area_name][pop_name])
+
+# Load spike data
+data, start_id = load_genn_spikes(data_path, area_name, pop_name)
+
+# Calculate exact correlations
+start_time = perf_counter()
+exact_cc = calc_correlations(data, 500.0, duration_s * 1000.0)
+exact_time = perf_counter() - start_time
+
+# Determine which neurons calc_correlations used
+# **NOTE** the trains stripped by calc_correlations are the ones calc_approx_correlations rejects
+candidate_ids = np.arange(np.amin(data[1]), np.amin(data[1]) + 2000 + 1001)
+approx_cc = calc_approx_correlations(data, 500.0, duration_s * 1000.0, num_neurons, start_id,
+                                     epsilon=epsilon, delta=delta, neuron_ids=candidate_ids, subsample=2000)
+
+# Calculate approximate correlations over whole population
+start_time = perf_counter()
+full_cc = calc_approx_correlations(data, 500.0, duration_s * 1000.0, num_neurons, start_id,
+                                   epsilon=epsilon, delta=delta)
+approx_time = perf_counter() - start_time
+
+print("Exact: %u pairs, mean=%f, %fs" % (len(exact_cc), np.mean(exact_cc), exact_time))
+print("Approximate (whole population): %u pairs, mean=%f, %fs" % (len(full_cc), np.mean(full_cc), approx_time))
+
+# Calculate Kolmogorov-Smirnov distance between exact and approximate CDFs over the same neurons
+# **NOTE** coefficients are rounded so rounding differences between np.corrcoef and
+# calc_approx_correlations don't split the large atoms of the discrete distribution
+exact_cc = np.sort(np.round(exact_cc, 10))
+approx_cc = np.sort(np.round(approx_cc, 10))
+x = np.union1d(exact_cc, approx_cc)
+ks = np.amax(np.abs(np.searchsorted(exact_cc, x, side="right") / float(len(exact_cc))
+                    - np.searchsorted(approx_cc, x, side="right") / float(len(approx_cc))))
+print("KS distance (subsample):%f, bound:%f (p=%f)" % (ks, epsilon, 1.0 - delta))
+
+# **NOTE** the bound holds with probability 1 - delta so this can occasionally fail
+assert ks <= epsilon
+print("Approximation within bound!")
@@ -0,0 +1,59 @@
+import numpy as np
+from os import path
+from sys import argv, exit
+
+from calc_accuracy_matrix import load_area_stats, populations, statistics
+
+def compare_values(full, compact, rtol, atol):
+    # Compare in double precision, returning maximum absolute and relative errors and whether they are within tolerance
+    full = np.asarray(full, dtype=np.float64)
+    compact = np.asarray(compact, dtype=np.float64)
+    if full.shape != compact.shape:
+        return np.inf, np.inf, False
+    elif full.size == 0:
+        return 0.0, 0.0, True
+
+    error = np.abs(full - compact)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(full == 0.0, error, error / np.abs(full))
+    return np.amax(error), np.amax(relative), bool(np.all(error <= (atol + (rtol * np.abs(full)))))
+
+if __name__ == '__main__':
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    assert len(args) >= 2
+    full_folder = args[0]
+    compact_folder = args[1]
+
+    # **NOTE** default tolerances allow for statistics being rounded to float32
+    rtol = float(options.get("rtol", 1E-6))
+    atol = float(options.get("atol", 1E-6))
+
+    print("%-5s %-14s %-8s %12s %12s %s" % ("Pop", "Statistic", "Values", "Max abs", "Max rel", ""))
+    all_within = True
+    for p in populations:
+        if not path.exists(path.join(full_folder, "areas_%s.npy" % p)):
+            continue
+
+        # Check same areas were analysed
+        full_areas, full_stats = load_area_stats(full_folder, p)
+        compact_areas, compact_stats = load_area_stats(compact_folder, p)
+        if full_areas != compact_areas:
+            print("%-5s areas differ" % p)
+            all_within = False
+            continue
+
+        # Compare per-neuron statistics of each area and population averages
+        for s in statistics:
+            results = [compare_values(full_stats[(a, s)], compact_stats[(a, s)], rtol, atol) for a in full_areas]
+            results.append(compare_values(np.load(path.join(full_folder, "average_pop_%s_%s.npy" % (s, p))),
+                                          np.load(path.join(compact_folder, "average_pop_%s_%s.npy" % (s, p))),
+                                          rtol, atol))
+            within = all(r[2] for r in results)
+            all_within = all_within and within
+            print("%-5s %-14s %-8u %12.3g %12.3g %s" % (p, s, sum(len(full_stats[(a, s)]) for a in full_areas),
+                                                      max(r[0] for r in results), max(r[1] for r in results),
+                                                      "" if within else "EXCEEDS TOLERANCE"))
+
+    exit(0 if all_within else 1)
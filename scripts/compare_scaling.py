@@ -0,0 +1,157 @@
+import csv
+import numpy as np
+import re
+from collections import OrderedDict
+from scipy.stats import t as t_dist
+from sys import argv, exit
+
+def load_benchmark_csv(filename):
+    # Read header and rows
+    # **NOTE** csv rather than np.genfromtxt as merging_data.csv has quoted headers containing commas
+    with open(filename, "r") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        rows = [r for r in reader if len(r) > 0]
+
+    # Leading "Num ..." columns identify the size of the benchmark e.g. number of neurons and synapses
+    num_key_columns = 0
+    while num_key_columns < len(header) and header[num_key_columns].startswith("Num"):
+        num_key_columns += 1
+    assert num_key_columns > 0
+
+    # Group repeats by column name and size
+    # **NOTE** scaling_data.csv stores repeats as repeated columns and merging_data.csv as repeated rows
+    cells = OrderedDict()
+    for r in rows:
+        size = tuple(int(float(v)) for v in r[:num_key_columns])
+        for name, value in zip(header[num_key_columns:], r[num_key_columns:]):
+            cell = cells.setdefault((name, size), [])
+            if value.strip() != "":
+                cell.append(float(value))
+
+    # Convert repeats to arrays
+    return header[:num_key_columns], OrderedDict((k, np.asarray(v)) for k, v in cells.items())
+
+def is_time_column(name):
+    # Columns of merging_data.csv give their units whereas every "<device> - <algorithm>"
+    # column of scaling_data.csv is a simulation time in seconds
+    # **NOTE** only times are compared as e.g. a higher SOL % or fewer registers isn't a slowdown
+    unit = re.search(r"\[(.*)\]\s*$", name)
+    return (unit.group(1) == "s") if unit is not None else (" - " in name)
+
+def select_columns(cells, match=None):
+    # Select cells of time columns, optionally only those whose names contain match
+    return OrderedDict((k, v) for k, v in cells.items()
+                       if is_time_column(k[0]) and (match is None or match in k[0]))
+
+def welch_difference(baseline, candidate, alpha):
+    """
+    Compare the means of two sets of repeats using Welch's t-test.
+
+    Returns
+    -------
+    diff : float
+        Candidate mean minus baseline mean.
+    ci : tuple
+        (1 - alpha) confidence interval of diff.
+    p : float
+        Two-sided p-value for diff being non-zero.
+    """
+    diff = np.mean(candidate) - np.mean(baseline)
+    baseline_var = np.var(baseline, ddof=1) / len(baseline)
+    candidate_var = np.var(candidate, ddof=1) / len(candidate)
+    se = np.sqrt(baseline_var + candidate_var)
+
+    # If there's no variance at all (e.g. register counts), any difference is exact
+    if se == 0.0:
+        return diff, (diff, diff), 0.0 if diff != 0.0 else 1.0
+
+    # Welch-Satterthwaite degrees of freedom
+    df = (baseline_var + candidate_var) ** 2 / ((baseline_var ** 2 / (len(baseline) - 1))
+                                                + (candidate_var ** 2 / (len(candidate) - 1)))
+    t_stat = diff / se
+    p = 2.0 * t_dist.sf(np.abs(t_stat), df)
+    half_width = t_dist.ppf(1.0 - (alpha / 2.0), df) * se
+    return diff, (diff - half_width, diff + half_width), p
+
+def holm_significant(p_values, alpha):
+    # Holm-Bonferroni step-down procedure to control family-wise error across all cells
+    p_values = np.asarray(p_values)
+    significant = np.zeros(len(p_values), dtype=bool)
+    for rank, i in enumerate(np.argsort(p_values)):
+        if p_values[i] > alpha / (len(p_values) - rank):
+            break
+        significant[i] = True
+    return significant
+
+def compare(baseline_cells, candidate_cells, alpha, threshold):
+    # Loop through cells present in baseline
+    results = []
+    for key, baseline in baseline_cells.items():
+        candidate = candidate_cells.get(key)
+        if candidate is None or len(candidate) < 2 or len(baseline) < 2:
+            results.append((key, baseline, candidate, None))
+        else:
+            results.append((key, baseline, candidate, welch_difference(baseline, candidate, alpha)))
+
+    # Correct for the number of cells being tested
+    tested = [i for i, r in enumerate(results) if r[3] is not None]
+    significant = np.zeros(len(results), dtype=bool)
+    significant[tested] = holm_significant([results[i][3][2] for i in tested], alpha)
+
+    # Flag cells which are both significantly and meaningfully slower
+    # **NOTE** cells the baseline could test but the candidate has too few repeats of (e.g. because runs
+    # failed) are also flagged, as a regression gate shouldn't pass just because the candidate didn't run
+    report = []
+    for (key, baseline, candidate, test), s in zip(results, significant):
+        if test is None:
+            report.append((key, baseline, candidate, None, len(baseline) >= 2))
+        else:
+            relative = test[0] / np.mean(baseline)
+            report.append((key, baseline, candidate, test + (relative,), s and relative > threshold))
+    return report
+
+def print_report(key_names, report):
+    print("%-40s %-20s %10s %10s %9s %23s %9s" % ("Column", ", ".join(key_names), "Baseline", "Candidate",
+                                                 "Change", "Confidence interval", "p"))
+    for (name, size), baseline, candidate, test, slowdown in report:
+        size = "x".join("%u" % s for s in size)
+        if test is None:
+            status = "missing" if candidate is None else "too few repeats"
+            print("%-40s %-20s %10s %10s %s%s" % (name, size, "", "", status, " FAILED" if slowdown else ""))
+        else:
+            diff, (ci_low, ci_high), p, relative = test
+            print("%-40s %-20s %10.4g %10.4g %+8.1f%% [%+10.3g, %+10.3g] %9.2g%s"
+                  % (name, size, np.mean(baseline), np.mean(candidate), relative * 100.0,
+                     ci_low, ci_high, p, " SLOWER" if slowdown else ""))
+
+if __name__ == '__main__':
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    assert len(args) >= 2
+    alpha = float(options.get("alpha", 0.05))
+    threshold = float(options.get("threshold", 0.05))
+
+    # Load baseline and candidate
+    baseline_key_names, baseline_cells = load_benchmark_csv(args[0])
+    candidate_key_names, candidate_cells = load_benchmark_csv(args[1])
+    assert baseline_key_names == candidate_key_names
+
+    # Only compare time columns, optionally matching filter e.g. "--match=sim tim" for merging_data.csv
+    # **NOTE** merging_data.csv spells its latest simulation time column "Latest sim tim [s]"
+    baseline_cells = select_columns(baseline_cells, options.get("match"))
+    assert len(baseline_cells) > 0, "No time columns to compare"
+
+    report = compare(baseline_cells, candidate_cells, alpha, threshold)
+    print_report(baseline_key_names, report)
+
+    # Exit with error if there are any slowdowns or untestable candidate cells so this can be used to gate upgrades
+    num_slowdowns = sum(r[4] for r in report if r[3] is not None)
+    num_failed = sum(r[4] for r in report if r[3] is None)
+    if num_slowdowns > 0 or num_failed > 0:
+        print("%u significant slowdowns (alpha=%g, threshold=%g%%), %u cells with too few candidate repeats"
+              % (num_slowdowns, alpha, threshold * 100.0, num_failed))
+        exit(1)
+    else:
+        print("No significant slowdowns")
@@ -0,0 +1,44 @@
+from glob import glob
+import json
+import numpy as np
+from os import path
+from sys import argv
+
+from calc_multi_area_stats import save_stats
+
+if __name__ == '__main__':
+    assert len(argv) >= 2
+    shard_dir = argv[1]
+
+    # Load manifests written by each completed shard
+    manifests = []
+    for m in glob(path.join(shard_dir, "shard_*_of_*.json")):
+        with open(m, "r") as f:
+            manifests.append(json.load(f))
+
+    # Check that every shard of a single sharding has completed
+    assert len(manifests) > 0
+    num_shards = manifests[0]["num_shards"]
+    assert all(m["num_shards"] == num_shards for m in manifests)
+    missing_shards = set(range(num_shards)) - set(m["shard"] for m in manifests)
+    assert len(missing_shards) == 0, "Shards %s have not completed" % sorted(missing_shards)
+
+    # Combine lists of units processed by shards
+    populations = manifests[0]["populations"]
+    units = sorted(tuple(u) for m in manifests for u in m["units"])
+
+    # Loop through populations
+    for p in populations:
+        # Loop through partial outputs for units containing this population
+        # **NOTE** units are sorted by area to match unsharded output
+        area_names = []
+        stats = []
+        for area_name, pop_name in units:
+            if pop_name == p:
+                partial = np.load(path.join(shard_dir, "%s_%s.npz" % (area_name, pop_name)))
+                if partial["valid"]:
+                    area_names.append(area_name)
+                    stats.append((partial["rates"], partial["irregularity"], partial["corr_coeff"]))
+
+        print("%s: merging %u areas" % (p, len(stats)))
+        save_stats(p, area_names, stats)
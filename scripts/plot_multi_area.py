@@ -9,7 +9,9 @@ import numpy as np
 import seaborn as sns
 from copy import copy
 from os import path
-from six import iteritems
+from six import iteritems, itervalues
+from spike_codec import load_spike_file
+from spike_store import load_store_index, load_store_spikes
 from sys import argv
 import plot_settings
 
@@ -48,26 +50,46 @@ def load_pop_data(stat_file_stem, simulator_prefix, data_path):
     # Create and populate numpy array of data
     return create_pop_data_array(populations, simulator_prefix, values)
 
-def plot_area(name, axis, data_path):
-    # Find files containing spikes for this area
-    area_spikes = list(reversed(sorted(glob(path.join(data_path, "genn_recordings", name + "_*.npy")))))
+def load_area_spikes(name, data_path, compressed=False):
+    # If GeNN data has been converted to a spike store
+    store_path = path.join(data_path, "genn_spike_store")
+    if path.exists(store_path):
+        # Get sub-populations in this area from index
+        units = load_store_index(store_path)["units"]
+        pop_names = list(reversed(sorted(u["pop"] for u in itervalues(units) if u["area"] == name)))
+
+        # Memory-map spikes and read exact neuron counts
+        spikes = [load_store_spikes(store_path, name, p)[0] for p in pop_names]
+        nums = [units[name + "_" + p]["num_neurons"] for p in pop_names]
+    else:
+        # Find files containing spikes for this area, using compressed files if requested
+        # **NOTE** decoding is slower than np.load from a warm cache
+        area_spikes = glob(path.join(data_path, "genn_recordings", name + "_*.spk")) if compressed else []
+        if len(area_spikes) == 0:
+            area_spikes = glob(path.join(data_path, "genn_recordings", name + "_*.npy"))
+        area_spikes = list(reversed(sorted(area_spikes)))
+
+        # Extract names of sub-populations from filenames
+        pop_names = [path.basename(s).split("_")[1].split(".")[0] for s in area_spikes]
+
+        # Load spikes and approximate neuron counts
+        spikes = [load_spike_file(s) for s in area_spikes]
+        nums = [int(np.amax(d[1])) for d in spikes]
+
+    return pop_names, spikes, nums
 
-    # Extract names of sub-populations from filenames
-    pop_names = [path.basename(s).split("_")[1].split(".")[0] for s in area_spikes]
+def plot_area(name, axis, data_path):
+    # Load spikes for each sub-population in this area
+    pop_names, area_spikes, area_nums = load_area_spikes(name, data_path, compressed)
     assert all(a[-1] == "I" for a in pop_names[::2])
     assert all(a[-1] == "E" for a in pop_names[1::2])
 
-    # Loop through area spike files and population names
+    # Loop through area spikes, population names and neuron counts
     start_id = 0
     layer_counts = np.zeros(len(pop_names) // 2, dtype=int)
     excitatory_actor = None
     inhibitory_actor = None
-    for i, (s, n)  in enumerate(zip(area_spikes, pop_names)):
-        data = np.load(s)
-        
-        # Approx
-        num = int(np.amax(data[1]))
-
+    for i, (data, n, num)  in enumerate(zip(area_spikes, pop_names, area_nums)):
         # Add num to layer count
         layer_counts[i // 2] += num
 
@@ -129,6 +151,9 @@ def plot_violin(nest_data, genn_data, axis, vertical, label, lim):
         axis.set_xlabel(label)
         axis.set_xlim(lim)
 
+# Read compressed GeNN recordings if requested e.g. python plot_multi_area.py spk
+compressed = "spk" in argv[1:]
+
 # Load pre-processed NEST data
 nest_rates_1_0 = load_pop_data("rates", "nest", "chi_1_0")
 nest_irregularity_1_0 = load_pop_data("irregularity", "nest", "chi_1_0")
@@ -0,0 +1,167 @@
+import numpy as np
+from collections import OrderedDict
+from scipy.optimize import nnls
+from scipy.stats import binom
+from sys import argv, exit
+
+from compare_scaling import load_benchmark_csv
+
+# Connectivity modes, in the order they appear in scaling_data.csv
+modes = ["Sparse", "Bitmask", "Procedural"]
+
+# Memory of the devices benchmarked in scaling_data.csv
+# **NOTE** the Jetson TX2's memory is shared between CPU and GPU
+device_memory_gb = {"Jetson TX2": 8.0, "GeForce MX130": 2.0, "GeForce GTX 1650": 4.0, "Titan RTX": 24.0}
+
+def get_populations(num_neurons, excitatory_inhibitory_ratio=4.0):
+    # Split neurons between excitatory and inhibitory populations as in parameters.h
+    num_excitatory = int(np.floor(((num_neurons * excitatory_inhibitory_ratio) / (1.0 + excitatory_inhibitory_ratio)) + 0.5))
+    return OrderedDict([("E", num_excitatory), ("I", num_neurons - num_excitatory)])
+
+def get_max_row_length(num_pre, num_post, probability):
+    # GeNN's FixedProbability snippet sizes rows so all of them fit with probability 0.9999
+    return int(binom.ppf(0.9999 ** (1.0 / num_pre), num_post, probability))
+
+def calc_memory(num_neurons, probability, scalar_bytes=4, index_bytes=4, weight_bytes=0):
+    """
+    Calculate the host and device memory GeNN allocates for the va_benchmark
+    model in each connectivity mode.
+
+    Parameters
+    ----------
+    num_neurons : total number of neurons
+    probability : connection probability
+    scalar_bytes : size of model precision (4 for float, 8 for double)
+    index_bytes : size of sparse postsynaptic indices
+    weight_bytes : size of per-synapse weights (0 for global weights as in model.cc)
+
+    **NOTE** numThreadsPerSpike only changes how GeNN's kernels divide rows
+    between threads, not what is allocated, so it is not a parameter. Its
+    effect on runtime is not modelled either as the scaling data was only
+    recorded with the configuration in parameters.h.
+
+    Returns
+    -------
+    dictionary mapping mode names to (host bytes, device bytes)
+    """
+    populations = get_populations(num_neurons)
+
+    # Neuron state - V and RefracTime, spike count and spikes and an inSyn per incoming synapse group
+    # **NOTE** the excitatory population's V and spikes are also allocated on host for recording
+    neuron_device = sum((2 * scalar_bytes * n) + (4 * (n + 1)) + (len(populations) * scalar_bytes * n)
+                        for n in populations.values())
+    neuron_host = (scalar_bytes * populations["E"]) + (4 * (populations["E"] + 1))
+
+    # Global Philox RNG state
+    rng_device = 64
+
+    memory = OrderedDict()
+    for mode in modes:
+        synapse_device = 0
+        for num_pre in populations.values():
+            for num_post in populations.values():
+                if mode == "Sparse":
+                    # Row lengths and padded rows of postsynaptic indices (and weights)
+                    max_row_length = get_max_row_length(num_pre, num_post, probability)
+                    synapse_device += (4 * num_pre) + ((index_bytes + weight_bytes) * num_pre * max_row_length)
+                elif mode == "Bitmask":
+                    # One bit per pre and postsynaptic neuron pair (and dense weights)
+                    synapse_device += 4 * (((num_pre * num_post) // 32) + 1) + (weight_bytes * num_pre * num_post)
+                else:
+                    # Procedural connectivity is regenerated so only per-synapse weights would need storing
+                    assert weight_bytes == 0, "Procedural connectivity requires global weights"
+
+        memory[mode] = (neuron_host, neuron_device + rng_device + synapse_device)
+    return memory
+
+def fit_runtime(cells, device, mode):
+    """
+    Fit time = a + (b * neurons) + (c * synapses) with non-negative
+    coefficients to the mean times measured for a device and mode,
+    minimising absolute error so the largest sizes dominate the fit.
+
+    Returns
+    -------
+    coefficients : array of (a, b, c) or None if there is insufficient data
+    sizes : array of measured (neurons, synapses)
+    times : array of mean measured times
+    """
+    sizes = []
+    times = []
+    for (name, size), repeats in cells.items():
+        if name == ("%s - %s" % (device, mode)) and len(repeats) > 0:
+            sizes.append(size)
+            times.append(np.mean(repeats))
+    if len(sizes) < 3:
+        return None, None, None
+
+    order = np.argsort([s[1] for s in sizes])
+    sizes = np.asarray(sizes, dtype=np.float64)[order]
+    times = np.asarray(times)[order]
+    design = np.column_stack((np.ones(len(times)), sizes[:, 0], sizes[:, 1]))
+    # **NOTE** relative errors would weight the smallest sizes most, where GPU occupancy
+    # makes times almost constant, so the fit would extrapolate badly to larger sizes
+    coefficients, _ = nnls(design, times)
+    return coefficients, sizes, times
+
+def predict_runtime(coefficients, sizes, times, num_neurons, num_synapses):
+    # Within measured range, interpolate measurements in log-log space
+    # **NOTE** GPU occupancy makes scaling non-linear at small sizes so the fit is only used to extrapolate
+    if sizes[0, 1] <= num_synapses <= sizes[-1, 1]:
+        return np.exp(np.interp(np.log(num_synapses), np.log(sizes[:, 1]), np.log(times)))
+    else:
+        return coefficients[0] + (coefficients[1] * num_neurons) + (coefficients[2] * num_synapses)
+
+if __name__ == '__main__':
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    assert len(args) >= 2
+    num_neurons = int(args[0])
+    device = args[1]
+    probability = float(options.get("probability", 0.1))
+    scalar_bytes = 8 if "double" in options else 4
+    index_bytes = int(options.get("index-bytes", 4))
+    weight_bytes = int(options.get("weight-bytes", 0))
+
+    # Use device's memory as budget unless one is specified
+    budget_gb = float(options.get("memory-budget", device_memory_gb.get(device, np.inf)))
+
+    # Load benchmark data and check device is present
+    # **NOTE** the scaling benchmarks all used a connection probability of 0.1
+    key_names, cells = load_benchmark_csv(options.get("data", "scaling_data.csv"))
+    assert any(n.startswith(device + " - ") for n, _ in cells.keys()), "No data for device '%s'" % device
+    num_synapses = int(round(probability * num_neurons * num_neurons))
+
+    memory = calc_memory(num_neurons, probability, scalar_bytes, index_bytes, weight_bytes)
+
+    print("%u neurons, %u synapses on %s with %.1f GB budget" % (num_neurons, num_synapses, device, budget_gb))
+    print("%-12s %12s %14s %14s %s" % ("Mode", "Host [MB]", "Device [MB]", "Runtime [s]", ""))
+    candidates = []
+    for mode, (host_bytes, device_bytes) in memory.items():
+        coefficients, sizes, times = fit_runtime(cells, device, mode)
+        fits = (device_bytes / (1024.0 ** 3)) <= budget_gb
+        notes = []
+        if not fits:
+            notes.append("exceeds budget")
+        if coefficients is None:
+            runtime = np.nan
+            notes.append("no runtime data")
+        else:
+            runtime = predict_runtime(coefficients, sizes, times, num_neurons, num_synapses)
+            extrapolated = not (sizes[0, 1] <= num_synapses <= sizes[-1, 1])
+            if extrapolated:
+                notes.append("extrapolated from %g-%g synapses" % (sizes[0, 1], sizes[-1, 1]))
+            if fits:
+                candidates.append((extrapolated, runtime, mode))
+
+        print("%-12s %12.1f %14.1f %14.4g %s" % (mode, host_bytes / (1024.0 ** 2), device_bytes / (1024.0 ** 2),
+                                                runtime, ", ".join(notes)))
+
+    # Recommend fastest mode which fits, preferring modes whose runtime was measured at this size
+    if len(candidates) == 0:
+        print("No connectivity mode fits within budget")
+        exit(1)
+    else:
+        extrapolated, _, mode = min(candidates)
+        print("Recommended: %s%s" % (mode, " (untrusted - runtime extrapolated beyond measured sizes)" if extrapolated else ""))
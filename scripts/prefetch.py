@@ -0,0 +1,69 @@
+import sys
+from threading import Condition, Thread
+
+def _get_nbytes(data):
+    return 0 if data is None else data.nbytes
+
+def prefetch_units(loader, source, units, depth=2, max_bytes=None):
+    """
+    Load (area, population) work units on a background thread, up to depth
+    units ahead of the consumer and, if max_bytes is set, only while the
+    units loaded but not yet released by the consumer take up less than
+    max_bytes. Loaded (data, start_id) tuples are yielded in the same order
+    as units.
+    """
+    condition = Condition()
+    loaded = []
+    state = {"pending_bytes": 0, "stop": False}
+
+    def load():
+        for area_name, pop_name in units:
+            with condition:
+                # Wait until there is space in the queue
+                # **NOTE** always allow one unit to be loaded so a single large unit can't deadlock
+                while (not state["stop"]
+                       and (len(loaded) >= depth
+                            or (max_bytes is not None and len(loaded) > 0 and state["pending_bytes"] >= max_bytes))):
+                    condition.wait()
+                if state["stop"]:
+                    return
+
+            # Load unit, passing any exception to consumer
+            try:
+                result = (loader(source, area_name, pop_name), None)
+            except Exception:
+                result = ((None, 0), sys.exc_info()[1])
+
+            with condition:
+                loaded.append(result)
+                state["pending_bytes"] += _get_nbytes(result[0][0])
+                condition.notify_all()
+
+    thread = Thread(target=load)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        previous_bytes = 0
+        for _ in units:
+            with condition:
+                # Release the unit the consumer has finished with
+                state["pending_bytes"] -= previous_bytes
+                condition.notify_all()
+
+                # Wait for next unit
+                while len(loaded) == 0:
+                    condition.wait()
+                result, exception = loaded.pop(0)
+                condition.notify_all()
+
+            if exception is not None:
+                raise exception
+
+            previous_bytes = _get_nbytes(result[0])
+            yield result
+    finally:
+        # Stop loader thread if consumer finishes early
+        with condition:
+            state["stop"] = True
+            condition.notify_all()
@@ -0,0 +1,166 @@
+import json
+import os
+import resource
+from glob import glob
+from os import path
+from time import perf_counter, process_time
+
+# Profiling is enabled in worker processes by the environment
+# so it is inherited however multiprocessing starts them
+PROFILE_DIR_ENV = "MULTI_AREA_PROFILE_DIR"
+
+_records = []
+_stack = []
+
+def enable(profile_dir):
+    if not path.exists(profile_dir):
+        os.makedirs(profile_dir)
+
+    # Remove records from any previous run
+    for f in glob(path.join(profile_dir, "profile_*.json")):
+        os.remove(f)
+
+    os.environ[PROFILE_DIR_ENV] = profile_dir
+
+def _read_bytes():
+    # Read total bytes read by this process from procfs (Linux only)
+    try:
+        with open("/proc/self/io", "r") as f:
+            for l in f:
+                if l.startswith("rchar:"):
+                    return int(l.split()[1])
+    except (IOError, OSError):
+        pass
+    return 0
+
+def _read_peak_rss_mb():
+    # Read peak resident set size from procfs, falling back to rusage
+    # **NOTE** ru_maxrss cannot be reset so, without procfs, this is the peak of the whole process so far
+    try:
+        with open("/proc/self/status", "r") as f:
+            for l in f:
+                if l.startswith("VmHWM:"):
+                    return int(l.split()[1]) / 1024.0
+    except (IOError, OSError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def _reset_peak_rss():
+    # Reset peak resident set size so next read measures peak since now (Linux 4.0+)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except (IOError, OSError):
+        pass
+
+class _Stage(object):
+    def __init__(self, name, area, pop):
+        self.name = name
+        self.area = area
+        self.pop = pop
+
+    def __enter__(self):
+        # Inherit area and population from enclosing stage
+        if len(_stack) > 0:
+            parent = _stack[-1]
+            self.area = parent.area if self.area is None else self.area
+            self.pop = parent.pop if self.pop is None else self.pop
+
+            # Fold peak so far into parent before resetting it
+            parent.peak_rss_mb = max(parent.peak_rss_mb, _read_peak_rss_mb())
+
+        _reset_peak_rss()
+        _stack.append(self)
+        self.peak_rss_mb = 0.0
+        self.start_bytes = _read_bytes()
+        self.start_cpu = process_time()
+        self.start_wall = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = perf_counter() - self.start_wall
+        cpu = process_time() - self.start_cpu
+        self.peak_rss_mb = max(self.peak_rss_mb, _read_peak_rss_mb())
+        _stack.pop()
+
+        # Propagate peak to parent
+        if len(_stack) > 0:
+            _stack[-1].peak_rss_mb = max(_stack[-1].peak_rss_mb, self.peak_rss_mb)
+
+        _records.append({"stage": self.name, "area": self.area, "pop": self.pop, "pid": os.getpid(), "depth": len(_stack),
+                         "wall_s": wall, "cpu_s": cpu, "read_mb": (_read_bytes() - self.start_bytes) / (1024.0 * 1024.0),
+                         "peak_rss_mb": self.peak_rss_mb})
+        return False
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_null_stage = _NullStage()
+
+def stage(name, area=None, pop=None):
+    # If profiling is disabled, return shared context manager which does nothing
+    if PROFILE_DIR_ENV not in os.environ:
+        return _null_stage
+    else:
+        return _Stage(name, area, pop)
+
+def write_records():
+    # Write records from this process to profile directory
+    if PROFILE_DIR_ENV in os.environ and len(_records) > 0:
+        with open(path.join(os.environ[PROFILE_DIR_ENV], "profile_%u.json" % os.getpid()), "w") as f:
+            json.dump(_records, f)
+        del _records[:]
+
+def _summarise(records, key):
+    summary = {}
+    for r in records:
+        s = summary.setdefault(key(r), {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "read_mb": 0.0,
+                                        "peak_rss_mb": 0.0, "peak_pid": None})
+        s["count"] += 1
+        s["wall_s"] += r["wall_s"]
+        s["cpu_s"] += r["cpu_s"]
+        s["read_mb"] += r["read_mb"]
+        if r["peak_rss_mb"] >= s["peak_rss_mb"]:
+            s["peak_rss_mb"] = r["peak_rss_mb"]
+            s["peak_pid"] = r["pid"]
+    return summary
+
+def write_report():
+    if PROFILE_DIR_ENV not in os.environ:
+        return
+
+    # Merge records from all processes
+    write_records()
+    profile_dir = os.environ[PROFILE_DIR_ENV]
+    records = []
+    for f in sorted(glob(path.join(profile_dir, "profile_*.json"))):
+        with open(f, "r") as r:
+            records.extend(json.load(r))
+
+    # Summarise by stage and by (area, population) task
+    stages = _summarise([r for r in records if r["stage"] != "task"], lambda r: r["stage"])
+    tasks = _summarise([r for r in records if r["stage"] == "task"], lambda r: "%s_%s" % (r["area"], r["pop"]))
+    processes = _summarise([r for r in records if r["depth"] == 0], lambda r: str(r["pid"]))
+
+    with open(path.join(profile_dir, "profile.json"), "w") as f:
+        json.dump({"records": records, "stages": stages, "tasks": tasks, "processes": processes}, f, indent=4)
+
+    # Build human-readable tables
+    lines = []
+    for title, summary in (("Stage", stages), ("Task", tasks), ("Process", processes)):
+        # Size name column to fit longest name e.g. calc_correlations
+        width = max([len(title)] + [len(name) for name in summary.keys()])
+        lines.append("%-*s %6s %10s %10s %10s %13s %8s" % (width, title, "Count", "Wall [s]", "CPU [s]",
+                                                          "Read [MB]", "Peak RSS [MB]", "Peak PID"))
+        for name, s in sorted(summary.items(), key=lambda i: -i[1]["wall_s"]):
+            lines.append("%-*s %6u %10.2f %10.2f %10.1f %13.1f %8u" % (width, name, s["count"], s["wall_s"], s["cpu_s"],
+                                                                  s["read_mb"], s["peak_rss_mb"], s["peak_pid"]))
+        lines.append("")
+
+    with open(path.join(profile_dir, "profile.txt"), "w") as f:
+        f.write("\n".join(lines))
+    print("\n".join(lines))
@@ -0,0 +1,142 @@
+from glob import glob
+import json
+import numpy as np
+from os import makedirs, path
+from sys import argv
+
+# Layout of tensor directory:
+# index.json        - areas, populations, neuron counts, duration and bin width of each level
+# counts_<l>.npy    - (num_areas, num_populations, num_bins) uint32 spike counts at level l
+# **NOTE** level 0 has the finest bins and each subsequent level merges factor bins of the previous one
+TENSOR_VERSION = 1
+
+def write_pyramid_level(tensor_path, level, counts, factor):
+    # Sum groups of factor bins, padding the last group with zeros
+    num_bins = (counts.shape[2] + factor - 1) // factor
+    coarse = np.lib.format.open_memmap(path.join(tensor_path, "counts_%u.npy" % level), mode="w+",
+                                       dtype=np.uint32, shape=(counts.shape[0], counts.shape[1], num_bins))
+    for a in range(counts.shape[0]):
+        padded = np.zeros((counts.shape[1], num_bins * factor), dtype=np.uint64)
+        padded[:, :counts.shape[2]] = counts[a]
+        coarse[a] = padded.reshape(counts.shape[1], num_bins, factor).sum(axis=2)
+    coarse.flush()
+    return coarse
+
+def build_rate_tensor(tensor_path, loader, source, population_sizes, populations, duration_s,
+                      bin_ms=1.0, num_levels=8, factor=2):
+    """
+    Bin spikes of every (area, population) into a memory-mapped tensor of
+    spike counts in a single pass over the recordings, then build coarser
+    levels by summing groups of factor bins.
+    """
+    areas = sorted(population_sizes.keys())
+    num_bins = int(np.ceil((duration_s * 1000.0) / bin_ms))
+
+    if not path.exists(tensor_path):
+        makedirs(tensor_path)
+
+    # Bin spikes of each unit into finest level
+    counts = np.lib.format.open_memmap(path.join(tensor_path, "counts_0.npy"), mode="w+",
+                                       dtype=np.uint32, shape=(len(areas), len(populations), num_bins))
+    num_neurons = np.zeros((len(areas), len(populations)), dtype=np.int64)
+    for a, area_name in enumerate(areas):
+        for p, pop_name in enumerate(populations):
+            num_neurons[a, p] = int(population_sizes[area_name].get(pop_name, 0))
+            if num_neurons[a, p] == 0:
+                continue
+
+            data, _ = loader(source, area_name, pop_name)
+            if data is not None:
+                # **NOTE** like np.histogram, spikes at the very end of the simulation are included in last bin
+                times = np.asarray(data[0])
+                times = times[(times >= 0.0) & (times <= (duration_s * 1000.0))]
+                bins = np.minimum((times / bin_ms).astype(np.int64), num_bins - 1)
+                counts[a, p] = np.bincount(bins, minlength=num_bins)
+    counts.flush()
+
+    # Build pyramid
+    bin_widths = [bin_ms]
+    level = counts
+    for l in range(1, num_levels):
+        if level.shape[2] == 1:
+            break
+        level = write_pyramid_level(tensor_path, l, level, factor)
+        bin_widths.append(bin_widths[-1] * factor)
+
+    # Write index last so a partially-written tensor can't be opened
+    with open(path.join(tensor_path, "index.json"), "w") as f:
+        json.dump({"version": TENSOR_VERSION, "areas": areas, "populations": populations,
+                   "num_neurons": num_neurons.tolist(), "duration_s": duration_s,
+                   "bin_widths_ms": bin_widths}, f, indent=4)
+
+def load_rate_tensor_index(tensor_path):
+    with open(path.join(tensor_path, "index.json"), "r") as f:
+        index = json.load(f)
+
+    assert index["version"] == TENSOR_VERSION
+    return index
+
+def load_counts(tensor_path, bin_ms):
+    # Memory-map the level with the requested bin width
+    index = load_rate_tensor_index(tensor_path)
+    level = [np.isclose(b, bin_ms) for b in index["bin_widths_ms"]].index(True)
+    return np.load(path.join(tensor_path, "counts_%u.npy" % level), mmap_mode="r")
+
+def load_rates(tensor_path, bin_ms, area_name=None, pop_name=None):
+    """
+    Calculate population rates in Hz from the level with the requested bin
+    width, optionally slicing a single area and/or population.
+    """
+    index = load_rate_tensor_index(tensor_path)
+    counts = load_counts(tensor_path, bin_ms)
+    num_neurons = np.asarray(index["num_neurons"], dtype=np.float64)
+
+    # Slice requested area and population
+    a = slice(None) if area_name is None else index["areas"].index(area_name)
+    p = slice(None) if pop_name is None else index["populations"].index(pop_name)
+
+    # **NOTE** if duration isn't a multiple of the bin width, the last bin only covers the remainder
+    bin_widths_s = np.full(counts.shape[2], bin_ms / 1000.0)
+    bin_widths_s[-1] = min(bin_ms, (index["duration_s"] * 1000.0) - ((counts.shape[2] - 1) * bin_ms)) / 1000.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return counts[a, p] / (num_neurons[a, p, ..., np.newaxis] * bin_widths_s)
+
+if __name__ == '__main__':
+    # Import loaders here as they have more dependencies than reading the tensor
+    from calc_multi_area_stats import (load_compressed_genn_spikes, load_genn_spikes,
+                                       load_gdf_nest_spikes, load_hdf5_nest_spikes)
+    from spike_store import load_store_spikes
+
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    assert len(args) >= 2
+    data_path = args[0]
+    duration_s = float(args[1])
+    tensor_path = options.get("output", path.join(data_path, "rate_tensor"))
+
+    # Load model description and extract population sizes
+    custom_data_model_filename = list(glob(path.join(data_path, "custom_Data_Model_*.json")))[0]
+    with open(custom_data_model_filename, "r") as f:
+        population_sizes = json.load(f)["neuron_numbers"]
+
+    # Population names
+    populations = ["4E", "4I", "5E", "5I", "6E", "6I", "23E", "23I"]
+
+    # Select loader
+    if "store" in options:
+        source = path.join(data_path, "spike_store") if options["store"] is True else options["store"]
+        loader = load_store_spikes
+    elif len(args) > 2:
+        source = args[2]
+        loader = load_hdf5_nest_spikes if source.endswith(".hdf5") else load_gdf_nest_spikes
+    else:
+        source = data_path
+        loader = load_compressed_genn_spikes if "spk" in options else load_genn_spikes
+
+    build_rate_tensor(tensor_path, loader, source, population_sizes, populations, duration_s,
+                      float(options.get("bin", 1.0)), int(options.get("levels", 8)), int(options.get("factor", 2)))
+
+    index = load_rate_tensor_index(tensor_path)
+    print("Built %u level rate tensor with bin widths %s ms" % (len(index["bin_widths_ms"]),
+                                                                ", ".join("%g" % b for b in index["bin_widths_ms"])))
@@ -0,0 +1,74 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# Shared memory blocks this process has attached to, by name
+# **NOTE** blocks must stay attached for as long as views of them may be in use
+_attached = {}
+
+class SharedSpikePool(object):
+    """
+    Owner of a shared memory block per (area, population) containing its
+    spike data. Blocks are unlinked when the pool is closed so it should
+    only be closed once all worker processes have finished.
+    """
+    def __init__(self):
+        self.blocks = []
+        self.descriptors = {}
+
+    def add(self, area_name, pop_name, data, start_id):
+        # Create block and copy data into it
+        block = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        self.blocks.append(block)
+        shared_data = np.ndarray(data.shape, dtype=data.dtype, buffer=block.buf)
+        shared_data[:] = data
+
+        # Add picklable descriptor so workers can attach
+        self.descriptors[(area_name, pop_name)] = (block.name, data.shape, data.dtype.str, start_id)
+
+    def load(self, loader, source, units):
+        # Load each unit once using standard loader
+        # **NOTE** if loading fails, blocks which have already been created are unlinked
+        try:
+            for area_name, pop_name in units:
+                data, start_id = loader(source, area_name, pop_name)
+                if data is not None:
+                    self.add(area_name, pop_name, data, start_id)
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        for b in self.blocks:
+            b.close()
+            b.unlink()
+        self.blocks = []
+        self.descriptors = {}
+
+def load_shared_spikes(descriptors, area_name, pop_name):
+    # If there's no data for this population, return same as other loaders
+    if (area_name, pop_name) not in descriptors:
+        return None, 0
+
+    # Attach to block if we haven't already
+    name, shape, dtype, start_id = descriptors[(area_name, pop_name)]
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+
+    # Return read-only view of block
+    data = np.ndarray(shape, dtype=dtype, buffer=_attached[name].buf)
+    data.flags.writeable = False
+    return data, start_id
+
+def detach_shared_spikes():
+    # Detach from all blocks
+    # **NOTE** any views returned by load_shared_spikes must no longer be in use
+    for block in _attached.values():
+        block.close()
+    _attached.clear()
+
+def run_detaching_shared_spikes(target, *args):
+    # Run worker, detaching from blocks it attached to once it finishes, even if it fails
+    try:
+        target(*args)
+    finally:
+        detach_shared_spikes()
@@ -0,0 +1,186 @@
+from glob import glob
+import numpy as np
+import struct
+from os import path
+from sys import argv
+from time import perf_counter
+
+# Layout of compressed spike file:
+# header        - magic, version, timestep, total number of spikes and number of chunks
+# chunk table   - CHUNK_DTYPE record for each chunk
+# payload       - for each chunk, bit-packed timestep deltas followed by bit-packed ids
+# **NOTE** as the chunk table stores the first and last timestep of each chunk,
+# spikes within a time range can be decoded without reading the rest of the file
+MAGIC = b"SPKC"
+VERSION = 1
+HEADER_FORMAT = "<4sIdQI"
+CHUNK_DTYPE = np.dtype([("start_step", "<u8"), ("end_step", "<u8"), ("num_spikes", "<u4"),
+                        ("time_bits", "u1"), ("id_bits", "u1"), ("id_min", "<u8"),
+                        ("offset", "<u8"), ("length", "<u8")])
+
+# Maximum width of packed values that can be extracted from a single 64-bit word at any bit offset
+MAX_BITS = 57
+
+def pack_bits(values, width):
+    # Pack the lowest width bits of each value into a little-endian bit stream
+    if width == 0:
+        return np.zeros(0, dtype=np.uint8)
+
+    values = values.astype(np.uint64)
+    bits = ((values[:, np.newaxis] >> np.arange(width, dtype=np.uint64)) & 1).astype(np.uint8)
+    return np.packbits(bits.ravel(), bitorder="little")
+
+def unpack_bits(buffer, count, width):
+    if width == 0:
+        return np.zeros(count, dtype=np.uint64)
+
+    # View padded buffer as overlapping little-endian 64-bit words starting at every byte
+    padded = np.zeros(len(buffer) + 8, dtype=np.uint8)
+    padded[:len(buffer)] = buffer
+    words = np.ndarray(shape=(len(padded) - 7,), dtype="<u8", buffer=padded, strides=(1,))
+
+    # Gather the word containing each value, shift and mask
+    # **NOTE** this is why widths are limited to MAX_BITS
+    start = np.arange(count, dtype=np.uint64) * np.uint64(width)
+    return (words[start >> np.uint64(3)] >> (start & np.uint64(7))) & np.uint64((1 << width) - 1)
+
+def get_bit_width(max_value):
+    width = int(max_value).bit_length()
+    if width > MAX_BITS:
+        raise ValueError("Values require more than %u bits" % MAX_BITS)
+    return width
+
+def encode_spikes(spikes, dt, chunk_size=65536):
+    # Quantise spike times to timesteps and check this is lossless
+    # **NOTE** times are reconstructed as steps * dt so they must be bit-identical to
+    # this, otherwise spikes could move across thresholds used in analysis
+    steps = np.rint(spikes[0] / dt).astype(np.int64)
+    if not np.array_equal(steps * dt, spikes[0]):
+        raise ValueError("Spike times are not exactly multiples of timestep %f" % dt)
+    if np.any(np.diff(steps) < 0):
+        raise ValueError("Spike times are not sorted")
+    if np.any(steps < 0):
+        raise ValueError("Spike times are negative")
+    ids = spikes[1].astype(np.int64)
+
+    # Loop through chunks
+    num_chunks = (spikes.shape[1] + chunk_size - 1) // chunk_size
+    chunks = np.zeros(num_chunks, dtype=CHUNK_DTYPE)
+    payload = []
+    offset = 0
+    for c in range(num_chunks):
+        chunk_steps = steps[c * chunk_size:(c + 1) * chunk_size]
+        chunk_ids = ids[c * chunk_size:(c + 1) * chunk_size]
+
+        # Delta-encode times relative to first spike in chunk so chunk can be decoded independently
+        deltas = np.diff(chunk_steps, prepend=chunk_steps[0])
+        id_min = np.amin(chunk_ids)
+
+        # Bit-pack deltas and ids
+        time_bits = get_bit_width(np.amax(deltas))
+        id_bits = get_bit_width(np.amax(chunk_ids) - id_min)
+        packed_times = pack_bits(deltas, time_bits)
+        packed_ids = pack_bits(chunk_ids - id_min, id_bits)
+
+        length = len(packed_times) + len(packed_ids)
+        chunks[c] = (chunk_steps[0], chunk_steps[-1], len(chunk_steps), time_bits, id_bits, id_min, offset, length)
+        payload.extend((packed_times, packed_ids))
+        offset += length
+
+    return chunks, payload
+
+def write_spikes(filename, spikes, dt, chunk_size=65536):
+    chunks, payload = encode_spikes(spikes, dt, chunk_size)
+    with open(filename, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, dt, spikes.shape[1], len(chunks)))
+        f.write(chunks.tobytes())
+        for p in payload:
+            f.write(p.tobytes())
+
+def read_chunk_table(f):
+    magic, version, dt, num_spikes, num_chunks = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version %u compressed spike file" % VERSION)
+
+    chunks = np.frombuffer(f.read(num_chunks * CHUNK_DTYPE.itemsize), dtype=CHUNK_DTYPE)
+    return dt, chunks, f.tell()
+
+def decode_chunk(buffer, chunk):
+    # Split chunk into packed times and ids
+    num_spikes = int(chunk["num_spikes"])
+    time_bytes = ((num_spikes * int(chunk["time_bits"])) + 7) // 8
+    deltas = unpack_bits(buffer[:time_bytes], num_spikes, int(chunk["time_bits"]))
+    ids = unpack_bits(buffer[time_bytes:], num_spikes, int(chunk["id_bits"]))
+
+    # Undo delta-encoding and id offset
+    steps = np.cumsum(deltas, dtype=np.int64) + int(chunk["start_step"])
+    return steps, ids.astype(np.int64) + int(chunk["id_min"])
+
+def read_spikes(filename, t_min=None, t_max=None):
+    with open(filename, "rb") as f:
+        dt, chunks, payload_start = read_chunk_table(f)
+
+        # Select only the chunks which overlap time range
+        selected = np.ones(len(chunks), dtype=bool)
+        if t_min is not None:
+            selected &= (chunks["end_step"] * dt) >= t_min
+        if t_max is not None:
+            selected &= (chunks["start_step"] * dt) <= t_max
+
+        # Read and decode selected chunks
+        steps = []
+        ids = []
+        for c in chunks[selected]:
+            f.seek(payload_start + int(c["offset"]))
+            chunk_steps, chunk_ids = decode_chunk(np.frombuffer(f.read(int(c["length"])), dtype=np.uint8), c)
+            steps.append(chunk_steps)
+            ids.append(chunk_ids)
+
+    # Stack into same (time, id) shape as GeNN recordings
+    if len(steps) == 0:
+        return np.zeros((2, 0))
+    spikes = np.vstack((np.concatenate(steps) * dt, np.concatenate(ids).astype(np.float64)))
+
+    # Trim spikes in partially-overlapping chunks
+    if t_min is not None or t_max is not None:
+        mask = np.ones(spikes.shape[1], dtype=bool)
+        if t_min is not None:
+            mask &= spikes[0] >= t_min
+        if t_max is not None:
+            mask &= spikes[0] <= t_max
+        spikes = spikes[:, mask]
+    return spikes
+
+def load_spike_file(filename):
+    # Load either raw or compressed spikes based on extension
+    return read_spikes(filename) if filename.endswith(".spk") else np.load(filename)
+
+if __name__ == '__main__':
+    # Compress all GeNN recordings in directory e.g. python spike_codec.py seed_1/recordings 0.1
+    assert len(argv) >= 3
+    recordings_path = argv[1]
+    dt = float(argv[2])
+
+    for s in sorted(glob(path.join(recordings_path, "*.npy"))):
+        compressed_filename = path.splitext(s)[0] + ".spk"
+
+        # Load and compress
+        spikes = np.load(s)
+        start_time = perf_counter()
+        write_spikes(compressed_filename, spikes, dt)
+        encode_time = perf_counter() - start_time
+
+        # Time reading raw and compressed spikes
+        start_time = perf_counter()
+        raw_spikes = np.load(s)
+        raw_time = perf_counter() - start_time
+        start_time = perf_counter()
+        decoded_spikes = read_spikes(compressed_filename)
+        decode_time = perf_counter() - start_time
+
+        # Check decoded spikes match
+        assert np.array_equal(raw_spikes[0], decoded_spikes[0])
+        assert np.array_equal(raw_spikes[1], decoded_spikes[1])
+        print("%s: %.1fx smaller, encode %.3fs, decode %.3fs, np.load %.3fs"
+              % (path.basename(s), float(path.getsize(s)) / path.getsize(compressed_filename),
+                 encode_time, decode_time, raw_time))
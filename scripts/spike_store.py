@@ -0,0 +1,133 @@
+from glob import glob
+import json
+import numpy as np
+from os import makedirs, path
+from sys import argv
+
+# Layout of store:
+# index.json                    - dictionary of units, each with id base, number of neurons and spikes
+# <area>_<pop>_spikes.npy       - (2, num_spikes) float64 array of time-sorted (time, id - id base)
+# <area>_<pop>_neuron_order.npy - indices into spikes sorted by neuron and then time
+# <area>_<pop>_neuron_offsets.npy - (num_neurons + 1) offsets into neuron_order for each neuron
+STORE_VERSION = 1
+
+def load_network_gids(nest_data_path):
+    # Read first neuron id of each population from NEST's network_gids.txt if it is available
+    # **NOTE** each line contains area, population, first and last id
+    gids_filename = path.join(nest_data_path if path.isdir(nest_data_path) else path.dirname(nest_data_path),
+                              "network_gids.txt")
+    if not path.exists(gids_filename):
+        return None
+
+    with open(gids_filename, "r") as f:
+        gids = [l.strip().split(",") for l in f if len(l.strip()) > 0]
+    return {(g[0].strip(), g[1].strip()): int(g[2]) for g in gids}
+
+def write_store_unit(store_path, area_name, pop_name, spikes, id_base, num_neurons):
+    # Sort spikes by time
+    # **NOTE** stable so spikes emitted in same timestep stay in recorded order
+    spikes = spikes[:, np.argsort(spikes[0], kind="stable")]
+
+    # Rebase neuron ids
+    ids = spikes[1].astype(np.int64) - id_base
+    assert np.all(ids >= 0) and np.all(ids < num_neurons)
+    spikes = np.vstack((spikes[0], ids.astype(np.float64)))
+
+    # Build index of each neuron's spikes in time order
+    index_dtype = np.uint32 if spikes.shape[1] < np.iinfo(np.uint32).max else np.int64
+    neuron_order = np.argsort(ids, kind="stable").astype(index_dtype)
+    neuron_offsets = np.zeros(num_neurons + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids, minlength=num_neurons), out=neuron_offsets[1:])
+
+    stem = path.join(store_path, "%s_%s" % (area_name, pop_name))
+    np.save(stem + "_spikes.npy", spikes)
+    np.save(stem + "_neuron_order.npy", neuron_order)
+    np.save(stem + "_neuron_offsets.npy", neuron_offsets)
+    return spikes.shape[1]
+
+def load_store_index(store_path):
+    with open(path.join(store_path, "index.json"), "r") as f:
+        index = json.load(f)
+
+    assert index["version"] == STORE_VERSION
+    return index
+
+def load_store_spikes(store_path, area_name, pop_name):
+    # If there's no data for this population, return same as other loaders
+    stem = path.join(store_path, "%s_%s" % (area_name, pop_name))
+    if not path.exists(stem + "_spikes.npy"):
+        return None, 0
+
+    # Memory-map spikes
+    # **NOTE** ids are already rebased so start id is always zero
+    return np.load(stem + "_spikes.npy", mmap_mode="r"), 0
+
+def load_store_neuron_index(store_path, area_name, pop_name):
+    # Memory-map per-neuron index
+    stem = path.join(store_path, "%s_%s" % (area_name, pop_name))
+    return (np.load(stem + "_neuron_order.npy", mmap_mode="r"),
+            np.load(stem + "_neuron_offsets.npy", mmap_mode="r"))
+
+def get_neuron_spike_times(spikes, neuron_order, neuron_offsets, neuron):
+    # Gather time-sorted spike times of a single neuron
+    return spikes[0][neuron_order[neuron_offsets[neuron]:neuron_offsets[neuron + 1]]]
+
+if __name__ == '__main__':
+    # Import loaders here as they have more dependencies than reading the store
+    from calc_multi_area_stats import get_work_units, load_genn_spikes, load_gdf_nest_spikes, load_hdf5_nest_spikes
+
+    # Split command line into positional arguments and --key=value options
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in argv[1:] if a.startswith("--"))
+    assert len(args) >= 1
+    data_path = args[0]
+    store_path = options.get("store", path.join(data_path, "spike_store"))
+
+    # Load model description and extract population sizes
+    custom_data_model_filename = list(glob(path.join(data_path, "custom_Data_Model_*.json")))[0]
+    with open(custom_data_model_filename, "r") as f:
+        population_sizes = json.load(f)["neuron_numbers"]
+
+    # Population names
+    populations = ["4E", "4I", "5E", "5I", "6E", "6I", "23E", "23I"]
+
+    # Select loader
+    if len(args) > 1:
+        source = args[1]
+        simulator = "nest"
+        loader = load_hdf5_nest_spikes if source.endswith(".hdf5") else load_gdf_nest_spikes
+        network_gids = load_network_gids(source)
+    else:
+        source = data_path
+        simulator = "genn"
+        loader = load_genn_spikes
+        network_gids = None
+
+    if not path.exists(store_path):
+        makedirs(store_path)
+
+    # Loop through work units
+    units = {}
+    for area_name, pop_name in get_work_units(population_sizes, populations):
+        spikes, start_id = loader(source, area_name, pop_name)
+        if spikes is None:
+            continue
+
+        # Use explicit id base if there is one, otherwise the start id loader guessed
+        if network_gids is not None:
+            id_base = network_gids[(area_name, pop_name)]
+            id_base_source = "network_gids"
+        else:
+            id_base = start_id
+            id_base_source = "genn" if simulator == "genn" else "min_id"
+
+        num_neurons = int(population_sizes[area_name][pop_name])
+        num_spikes = write_store_unit(store_path, area_name, pop_name, spikes, id_base, num_neurons)
+        units["%s_%s" % (area_name, pop_name)] = {"area": area_name, "pop": pop_name, "id_base": id_base,
+                                                  "id_base_source": id_base_source,
+                                                  "num_neurons": num_neurons, "num_spikes": num_spikes}
+        print("%s %s: %u spikes" % (area_name, pop_name, num_spikes))
+
+    # Write index last so a partially-written store can't be opened
+    with open(path.join(store_path, "index.json"), "w") as f:
+        json.dump({"version": STORE_VERSION, "simulator": simulator, "units": units}, f, indent=4)
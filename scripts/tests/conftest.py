@@ -0,0 +1,5 @@
+import sys
+from os import path
+
+# Scripts are run from the scripts directory so make their modules importable
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
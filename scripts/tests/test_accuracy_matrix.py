@@ -0,0 +1,54 @@
+import numpy as np
+from scipy.stats import entropy, iqr, ks_2samp, wasserstein_distance
+
+from calc_accuracy_matrix import calc_batched_distances, calc_distances
+
+def calc_baseline_kl(ground_truth, comparison):
+    # KL divergence calculated as by calc_pairwise_histograms.py and plot_multi_area_kl_divergence.py
+    bin_size = (2.0 * iqr(ground_truth)) / (float(len(ground_truth)) ** (1.0 / 3.0))
+    min_y = np.amin(ground_truth)
+    max_y = np.amax(ground_truth)
+    bin_x = np.linspace(min_y, max_y, int(np.ceil((max_y - min_y) / bin_size)))
+    ground_truth_hist, _ = np.histogram(ground_truth, bins=bin_x)
+    comp_hist, _ = np.histogram(comparison, bins=bin_x)
+
+    bin_width = bin_x[1] - bin_x[0]
+    ground_truth_hist = np.divide(ground_truth_hist, np.sum(ground_truth_hist) / bin_width, dtype="float")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        comp_hist = np.divide(comp_hist, np.sum(comp_hist) / bin_width, dtype="float")
+    mask = (comp_hist > 1.0E-15)
+    return entropy(ground_truth_hist[mask], comp_hist[mask])
+
+def test_matches_scipy_and_baseline():
+    rng = np.random.RandomState(1234)
+    ground_truth = [rng.normal(0.0, 1.0, 1000), rng.gamma(2.0, 1.0, 500), np.round(rng.normal(5.0, 2.0, 800))]
+    comparison = [rng.normal(0.1, 1.0, 900), rng.gamma(2.2, 1.0, 700), np.round(rng.normal(5.0, 2.5, 600))]
+    ks, wasserstein, kl = calc_distances(ground_truth, comparison)
+    for i, (g, c) in enumerate(zip(ground_truth, comparison)):
+        assert np.isclose(ks[i], ks_2samp(g, c).statistic)
+        assert np.isclose(wasserstein[i], wasserstein_distance(g, c))
+        assert np.isclose(kl[i], calc_baseline_kl(g, c))
+
+def test_single_bin_kl():
+    # Ground truth with only two bin edges, with comparison inside and outside its range
+    ground_truth = np.asarray([0.0, 0.5, 1.0, 1.5, 2.0])
+    comparison = [np.asarray([0.2, 0.4, 1.9, 1.0, 1.1]), np.asarray([5.0, 6.0])]
+    _, _, kl = calc_distances([ground_truth, ground_truth], comparison)
+    assert np.array_equal(kl, [calc_baseline_kl(ground_truth, c) for c in comparison])
+    assert np.array_equal(kl, [0.0, 0.0])
+
+def test_identical_values_kl():
+    # Cells with zero IQR or range get a single bin rather than NaN
+    ground_truth = [np.full(50, 3.0), np.full(50, 3.0), np.concatenate((np.zeros(40), np.ones(10)))]
+    comparison = [np.full(50, 3.0), np.full(50, 4.0), np.concatenate((np.zeros(30), np.ones(20)))]
+    _, _, kl = calc_batched_distances(ground_truth, comparison, max_batch_values=100)
+    assert np.array_equal(kl, [0.0, 0.0, 0.0])
+
+def test_many_cells_match_scipy():
+    # Cells of varying sizes, with ties within and between samples, all sorted together
+    rng = np.random.RandomState(4321)
+    ground_truth = [np.round(rng.normal(0.0, 1.0, rng.randint(1, 200)), 1) for _ in range(50)]
+    comparison = [np.round(rng.normal(0.2, 1.2, rng.randint(1, 200)), 1) for _ in range(50)]
+    ks, wasserstein, _ = calc_distances(ground_truth, comparison)
+    assert np.allclose(ks, [ks_2samp(g, c).statistic for g, c in zip(ground_truth, comparison)])
+    assert np.allclose(wasserstein, [wasserstein_distance(g, c) for g, c in zip(ground_truth, comparison)])
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from calc_multi_area_stats import compact_spikes
+
+def test_on_grid_round_trip():
+    # Times rounded to 4 decimal places, as written to text files, are still on the grid
+    spikes = np.asarray([[0.0, 0.1, 123.4, 1999.9], [0, 3, 2, 2 ** 32 - 1]], dtype=np.float64)
+    compact = compact_spikes(spikes, 0.1)
+    assert compact.dtype == np.uint32
+    assert np.array_equal(compact, [[0, 1, 1234, 19999], [0, 3, 2, 2 ** 32 - 1]])
+
+def test_off_grid_times_rejected():
+    with pytest.raises(ValueError):
+        compact_spikes(np.asarray([[0.1, 0.25], [0.0, 1.0]]), 0.1)
+
+def test_overflow_rejected():
+    with pytest.raises(ValueError):
+        compact_spikes(np.asarray([[-0.1], [0.0]]), 0.1)
+    with pytest.raises(ValueError):
+        compact_spikes(np.asarray([[(2 ** 32) * 0.5], [0.0]]), 0.5)
+    with pytest.raises(ValueError):
+        compact_spikes(np.asarray([[0.1], [2.0 ** 32]]), 0.1)
+
+def test_empty():
+    assert compact_spikes(np.zeros((2, 0)), 0.1).shape == (2, 0)
@@ -0,0 +1,46 @@
+import numpy as np
+from collections import OrderedDict
+from os import path
+
+from compare_scaling import compare, is_time_column, load_benchmark_csv, select_columns
+
+scripts_dir = path.dirname(path.dirname(path.abspath(__file__)))
+
+def test_merging_match_selects_sim_times():
+    # Example from README must match sim time columns of real CSV, whatever their spelling
+    _, cells = load_benchmark_csv(path.join(scripts_dir, "merging_data.csv"))
+    names = set(n for n, _ in select_columns(cells, "sim tim"))
+    assert names == {"Latest sim tim [s]", "GeNN 4.1.0 sim time [s]"}
+
+def test_merging_time_columns():
+    _, cells = load_benchmark_csv(path.join(scripts_dir, "merging_data.csv"))
+    names = set(n for n, _ in select_columns(cells))
+    assert names == {"Latest sim tim [s]", "Latest compile time [s]",
+                     "GeNN 4.1.0 sim time [s]", "GeNN 4.1.0 compile time [s]"}
+
+def test_scaling_columns_are_times():
+    _, cells = load_benchmark_csv(path.join(scripts_dir, "scaling_data.csv"))
+    assert all(is_time_column(n) for n, _ in cells.keys())
+
+def test_higher_sol_not_slower():
+    # Clear increase in SOL % and decrease in registers aren't compared at all
+    baseline = OrderedDict([(("Latest memory SOL [%]", (1,)), np.asarray([50.0, 50.1, 49.9])),
+                            (("Latest registers per thread", (1,)), np.asarray([32.0, 32.0, 32.0]))])
+    candidate = OrderedDict([(("Latest memory SOL [%]", (1,)), np.asarray([90.0, 90.1, 89.9])),
+                             (("Latest registers per thread", (1,)), np.asarray([20.0, 20.0, 20.0]))])
+    assert len(select_columns(baseline)) == 0
+
+def test_slower_time_flagged():
+    baseline = OrderedDict([(("Latest sim tim [s]", (1,)), np.asarray([1.0, 1.01, 0.99, 1.0, 1.0]))])
+    candidate = OrderedDict([(("Latest sim tim [s]", (1,)), np.asarray([1.5, 1.51, 1.49, 1.5, 1.5]))])
+    report = compare(select_columns(baseline), candidate, 0.05, 0.05)
+    assert report[0][4]
+
+def test_missing_candidate_fails():
+    # Cells the candidate failed to run enough times fail, unless the baseline couldn't be tested either
+    baseline = OrderedDict([(("Latest sim tim [s]", (1,)), np.asarray([1.0, 1.01, 0.99])),
+                            (("Latest sim tim [s]", (2,)), np.asarray([2.0, 2.01, 1.99])),
+                            (("Latest sim tim [s]", (3,)), np.asarray([3.0]))])
+    candidate = OrderedDict([(("Latest sim tim [s]", (2,)), np.asarray([2.0]))])
+    report = compare(select_columns(baseline), candidate, 0.05, 0.05)
+    assert [r[4] for r in report] == [True, True, False]
@@ -0,0 +1,17 @@
+import numpy as np
+from os import path
+
+from compare_scaling import load_benchmark_csv
+from predict_connectivity import device_memory_gb, fit_runtime, modes
+
+def test_fit_matches_largest_sizes():
+    # The fitted model is only used to extrapolate beyond the largest measured size so must match it closely
+    _, cells = load_benchmark_csv(path.join(path.dirname(__file__), "..", "scaling_data.csv"))
+    for device in device_memory_gb.keys():
+        for mode in modes:
+            coefficients, sizes, times = fit_runtime(cells, device, mode)
+            if coefficients is None:
+                continue
+            assert coefficients[2] > 0.0
+            predicted = coefficients[0] + (coefficients[1] * sizes[-1, 0]) + (coefficients[2] * sizes[-1, 1])
+            assert np.isclose(predicted, times[-1], rtol=0.05), (device, mode)
@@ -0,0 +1,19 @@
+import numpy as np
+
+from rate_tensor import build_rate_tensor, load_rates
+
+def test_partial_last_bin(tmp_path):
+    # 5ms duration isn't a multiple of the 2ms and 4ms coarse bins
+    spikes = {("V1", "4E"): np.asarray([[0.5, 1.5, 2.5, 3.5, 4.5, 4.9], [0, 1, 0, 1, 0, 1]], dtype=np.float64)}
+    loader = lambda source, area, pop: (spikes.get((area, pop)), 0)
+    tensor_path = str(tmp_path / "rate_tensor")
+    build_rate_tensor(tensor_path, loader, None, {"V1": {"4E": 2}}, ["4E"], 0.005, num_levels=3)
+
+    # Rates are counts divided by neurons and the time each bin actually covers
+    np.testing.assert_allclose(load_rates(tensor_path, 1.0, "V1", "4E"), [500.0, 500.0, 500.0, 500.0, 1000.0])
+    np.testing.assert_allclose(load_rates(tensor_path, 2.0, "V1", "4E"), [500.0, 500.0, 1000.0])
+    np.testing.assert_allclose(load_rates(tensor_path, 4.0, "V1", "4E"), [500.0, 1000.0])
+
+    # Mean rate over the simulation is preserved at every level
+    for bin_ms, widths in ((1.0, [1.0] * 5), (2.0, [2.0, 2.0, 1.0]), (4.0, [4.0, 1.0])):
+        assert np.isclose(np.sum(load_rates(tensor_path, bin_ms, "V1", "4E") * widths) / 5.0, 600.0)
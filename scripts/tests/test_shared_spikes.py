@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+
+import shared_spikes
+from shared_spikes import SharedSpikePool, load_shared_spikes, run_detaching_shared_spikes
+
+def test_worker_detaches():
+    pool = SharedSpikePool()
+    try:
+        pool.add("V1", "4E", np.arange(10.0).reshape(2, 5), 3)
+
+        # Worker which attaches and then fails
+        def worker(descriptors):
+            data, start_id = load_shared_spikes(descriptors, "V1", "4E")
+            assert start_id == 3 and np.array_equal(data, np.arange(10.0).reshape(2, 5))
+            raise RuntimeError()
+
+        with pytest.raises(RuntimeError):
+            run_detaching_shared_spikes(worker, pool.descriptors)
+        assert len(shared_spikes._attached) == 0
+    finally:
+        pool.close()
+
+def test_failed_load_unlinks():
+    # Loader which fails after first unit has been added to pool, recording names of blocks created so far
+    pool = SharedSpikePool()
+    names = []
+    def loader(source, area_name, pop_name):
+        if area_name == "V2":
+            names.extend(d[0] for d in pool.descriptors.values())
+            raise IOError()
+        return np.zeros((2, 4)), 0
+
+    with pytest.raises(IOError):
+        pool.load(loader, None, [("V1", "4E"), ("V2", "4E")])
+
+    # Blocks should have been unlinked
+    assert len(names) == 1 and len(pool.blocks) == 0
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=names[0])
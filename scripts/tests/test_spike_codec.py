@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from os import makedirs, path
+
+from calc_multi_area_stats import calc_unit_stats, load_compressed_genn_spikes, load_genn_spikes
+from spike_codec import read_spikes, write_spikes
+
+def make_spikes(num_spikes, num_neurons, num_steps, dt, seed=1234):
+    # Generate sorted spikes on timestep grid, including some exactly at 500ms
+    rng = np.random.RandomState(seed)
+    steps = np.sort(np.concatenate((rng.randint(0, num_steps, num_spikes), [5000] * 20)))
+    return np.vstack((steps * dt, rng.randint(0, num_neurons, len(steps)).astype(np.float64)))
+
+def test_round_trip_exact(tmp_path):
+    spikes = make_spikes(100000, 1000, 20000, 0.1)
+    filename = str(tmp_path / "spikes.spk")
+    write_spikes(filename, spikes, 0.1, chunk_size=4096)
+
+    assert np.array_equal(read_spikes(filename), spikes)
+
+    # Check time range only decodes spikes within it
+    decoded = read_spikes(filename, 500.0, 1000.0)
+    mask = (spikes[0] >= 500.0) & (spikes[0] <= 1000.0)
+    assert np.array_equal(decoded, spikes[:, mask])
+
+def test_off_grid_times_rejected(tmp_path):
+    # 0.3 is not bit-identical to 3 * 0.1 so couldn't be reconstructed exactly
+    with pytest.raises(ValueError):
+        write_spikes(str(tmp_path / "spikes.spk"), np.asarray([[0.1, 0.3], [0.0, 1.0]]), 0.1)
+
+def test_stats_identical(tmp_path):
+    # Write same spikes as raw and compressed GeNN recordings
+    data_path = str(tmp_path)
+    makedirs(path.join(data_path, "recordings"))
+    spikes = make_spikes(50000, 100, 20000, 0.1)
+    np.save(path.join(data_path, "recordings", "V1_4E.npy"), spikes)
+    write_spikes(path.join(data_path, "recordings", "V1_4E.spk"), spikes, 0.1)
+
+    population_sizes = {"V1": {"4E": 100}}
+    raw_stats = next(calc_unit_stats(load_genn_spikes, data_path, 2.0, [("V1", "4E")], population_sizes))[2]
+    compressed_stats = next(calc_unit_stats(load_compressed_genn_spikes, data_path, 2.0, [("V1", "4E")],
+                                            population_sizes))[2]
+    # **NOTE** random spikes include coincident spikes from the same neuron whose LvR is NaN
+    for r, c in zip(raw_stats, compressed_stats):
+        np.testing.assert_array_equal(r, c)
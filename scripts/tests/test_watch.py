@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from os import makedirs, path
+
+from calc_multi_area_stats import load_genn_spikes, watch_genn_stats
+
+def write_recording(data_path, area_name, pop_name, times, ids):
+    np.save(path.join(data_path, "recordings", "%s_%s.npy" % (area_name, pop_name)),
+            np.vstack((times, ids)).astype(np.float64))
+
+@pytest.fixture
+def data_path(tmp_path, monkeypatch):
+    # Outputs are written to working directory
+    makedirs(str(tmp_path / "recordings"))
+    monkeypatch.chdir(str(tmp_path))
+    return str(tmp_path)
+
+def test_missing_area_times_out(data_path):
+    # B never writes its recording
+    rng = np.random.RandomState(1234)
+    write_recording(data_path, "A", "4E", np.sort(rng.uniform(0.0, 1000.0, 500)), rng.randint(0, 10, 500))
+    with pytest.raises(SystemExit) as ex:
+        watch_genn_stats(load_genn_spikes, data_path, 1.0, "4E", {"A": {"4E": 10}, "B": {"4E": 10}},
+                         0.01, timeout_s=0.1)
+    assert ex.value.code == 1
+
+def test_silent_area_skipped(data_path):
+    # A spikes throughout but B only spikes during the first 500ms and C never spikes
+    rng = np.random.RandomState(1234)
+    times = np.round(np.sort(rng.uniform(0.0, 1000.0, 2000)), 1)
+    write_recording(data_path, "A", "4E", times, rng.randint(0, 10, 2000))
+    write_recording(data_path, "B", "4E", [100.0, 200.0], [0, 1])
+    write_recording(data_path, "C", "4E", [], [])
+    watch_genn_stats(load_genn_spikes, data_path, 1.0, "4E", {"A": {"4E": 10}, "B": {"4E": 10}, "C": {"4E": 10}},
+                     0.01, timeout_s=10.0)
+    assert list(np.load("areas_4E.npy")) == ["A"]
+    assert len(np.load("rates_4E.npy")) == 10